@@ -0,0 +1,661 @@
+"""
+Answer Features - Lexical Scoring Primitives
+Backend-independent scoring pipeline shared by the TensorFlow and NumPy answer encoders
+"""
+import re
+import time
+import difflib
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple
+
+from spelling_index import SpellingIndex
+from ttl_cache import TTLCache
+
+
+STOP_WORDS = frozenset({
+    'the', 'is', 'a', 'an', 'and', 'to', 'of', 'it', 'that', 'this',
+    'in', 'on', 'for', 'with', 'by', 'at'
+})
+
+# Common typos fixed before tokenization
+TYPO_REPLACEMENTS = {
+    'asnwer': 'answer', 'fike': 'file', 'delte': 'delete',
+    'usedd': 'used', 'mdoal': 'model', 'dtaabase': 'database'
+}
+
+TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+# Synthesis weights: Concept Score (Reliable) over Neural (Experimental)
+W_CONCEPT = 0.6
+W_SEQ = 0.2
+W_NEURAL = 0.2
+
+# Cascade stages, cheapest first; the encoder only runs for undecided pairs
+CASCADE_STAGES = ('normalize', 'tokens', 'irrelevance_gate', 'concept', 'sequence', 'neural')
+
+# Slack for float round-off when comparing a score interval to the tolerance
+CASCADE_EPSILON = 1e-9
+
+# Range of the neural score (cosine similarity mapped to 0-1)
+NEURAL_SCORE_BOUNDS = (0.0, 1.0)
+
+# Derived fields stored on question documents by precompute_questions.py
+FEATURES_FIELD = 'ai_features'
+FEATURES_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, trim and fix common typos"""
+    text = text.lower().strip()
+    for wrong, right in TYPO_REPLACEMENTS.items():
+        text = text.replace(wrong, right)
+    return text
+
+
+def meaningful_tokens(text: str) -> Set[str]:
+    """Split text into tokens and remove stop words"""
+    return set(TOKEN_PATTERN.findall(text)) - STOP_WORDS
+
+
+def _reference(correct_answer: str, clean_correct: str, correct_tokens: Set[str]) -> Dict:
+    return {
+        'clean_correct': clean_correct,
+        'display_correct': str(correct_answer).strip(),
+        'correct_tokens': correct_tokens,
+        # Spelling correction uses the correct answer as dictionary
+        'spelling_index': SpellingIndex(correct_tokens, cutoff=0.8)
+    }
+
+
+def prepare_reference(correct_answer: str) -> Dict:
+    """Per-question reference features, built once and shared by every student"""
+    clean_correct = normalize_text(str(correct_answer))
+    return _reference(correct_answer, clean_correct, meaningful_tokens(clean_correct))
+
+
+def question_tokens(question_text: str) -> Set[str]:
+    """Meaningful tokens of a question (for the parrot check)"""
+    clean_question = normalize_text(str(question_text)) if question_text else ""
+    return meaningful_tokens(clean_question) if clean_question else set()
+
+
+def source_key(question_text: str, correct_answer: str) -> str:
+    """Hash of the raw texts precomputed features were derived from"""
+    return hashlib.sha1(f"{question_text}\x00{correct_answer}".encode('utf-8')).hexdigest()
+
+
+def question_features(question_text: str, correct_answer: str) -> Dict:
+    """Normalized texts and token sets of a question, as stored under FEATURES_FIELD"""
+    clean_correct = normalize_text(str(correct_answer))
+    return {
+        'version': FEATURES_VERSION,
+        'source': source_key(question_text, correct_answer),
+        'clean_question': normalize_text(str(question_text)) if question_text else "",
+        'question_tokens': sorted(question_tokens(question_text)),
+        'clean_correct': clean_correct,
+        'correct_tokens': sorted(meaningful_tokens(clean_correct))
+    }
+
+
+def features_match(features: Optional[Dict], question_text: str, correct_answer: str) -> bool:
+    """Are stored features current for these texts (same version, unedited question)"""
+    return bool(features) and features.get('version') == FEATURES_VERSION \
+        and features.get('source') == source_key(question_text, correct_answer)
+
+
+def encoder_fingerprint(vocabulary: List[str], arrays: List[np.ndarray]) -> str:
+    """Identity of an encoder's vocabulary + weights (precomputed embeddings must match it)"""
+    digest = hashlib.sha1('\n'.join(str(token) for token in vocabulary).encode('utf-8'))
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def analyze_pair(user_answer: str, correct_answer: str, question_text: str = "",
+                 reference: Optional[Dict] = None, stats: Optional['CascadeStats'] = None,
+                 question_token_set: Optional[Set[str]] = None) -> Dict:
+    """One shared normalization + tokenization pass over an answer pair"""
+    if reference is None:
+        reference = prepare_reference(correct_answer)
+
+    start = time.perf_counter()
+    clean_user = normalize_text(str(user_answer))
+    normalized = time.perf_counter()
+
+    user_tokens = reference['spelling_index'].correct_tokens(meaningful_tokens(clean_user))
+    if question_token_set is None:
+        question_token_set = question_tokens(question_text)
+
+    if stats is not None:
+        stats.record('normalize', normalized - start)
+        stats.record('tokens', time.perf_counter() - normalized)
+
+    return {
+        'clean_user': clean_user,
+        'clean_correct': reference['clean_correct'],
+        'display_correct': reference['display_correct'],
+        'user_tokens': user_tokens,
+        'correct_tokens': reference['correct_tokens'],
+        'question_tokens': question_token_set
+    }
+
+
+def cosine_scores(user_vecs: np.ndarray, ref_vecs: np.ndarray) -> np.ndarray:
+    """
+    Neural score of each row pair: (cosine + 1) / 2, always in NEURAL_SCORE_BOUNDS.
+    Same quantity call() trains (normalized Dot); zero vectors score 0.5.
+    """
+    norms = np.linalg.norm(user_vecs, axis=1) * np.linalg.norm(ref_vecs, axis=1)
+    cosine = np.sum(user_vecs * ref_vecs, axis=1) / np.maximum(norms, 1e-12)
+    return (np.clip(cosine, -1.0, 1.0) + 1) / 2
+
+
+def score_bounds(components: Dict, sequence_known: bool) -> Tuple[float, float]:
+    """Lowest and highest final score still reachable from the stages not yet run"""
+    sequence = (components['sequence'],) * 2 if sequence_known else (0.0, 1.0)
+    # combine_scores is non-decreasing in both sequence and neural
+    lo, hi = combine_scores(
+        concept=[components['concept']] * 2,
+        sequence=sequence,
+        neural=NEURAL_SCORE_BOUNDS,
+        parrot=components['parrot'],
+        irrelevance=components['irrelevance']
+    )
+    return float(lo), float(hi)
+
+
+def _decide(components: Dict, stage: str, score: float, stats: Optional['CascadeStats']) -> Dict:
+    components['early_score'] = score
+    components['decided_at'] = stage
+    if stats is not None:
+        stats.decide(stage)
+    return components
+
+
+def _pinned_score(lo: float, hi: float) -> float:
+    """Exact score when the interval has collapsed, midpoint of a tolerated one"""
+    return lo if hi - lo <= CASCADE_EPSILON else (lo + hi) / 2
+
+
+def lexical_components(analysis: Dict, tolerance: float = 0.0,
+                       stats: Optional['CascadeStats'] = None) -> Dict:
+    """
+    Run the lexical cascade stages for one analyzed answer pair.
+    'early_score' is set when the pair is decided without the neural encoder:
+    by a hard rule (empty, irrelevant or verbatim answer), or because the
+    final score is fixed whatever the remaining stages return, the neural
+    score being within NEURAL_SCORE_BOUNDS. A positive `tolerance` also
+    accepts intervals up to that width (scored at their midpoint, so off by
+    at most tolerance / 2); the default 0 keeps every score equal to the
+    full pipeline.
+    """
+    components = {
+        'early_score': None,
+        'decided_at': None,
+        'concept': 0.0,
+        'sequence': 0.0,
+        'parrot': 1.0,
+        'irrelevance': 0.0
+    }
+
+    # Basic Validation
+    if len(analysis['clean_user']) < 2:
+        return _decide(components, 'normalize', 0.0, stats)
+
+    user_tokens = analysis['user_tokens']
+    correct_tokens = analysis['correct_tokens']
+
+    # --- HALLUCINATION / IRRELEVANCE CHECK ---
+    # If user answer has significant words that are NOT in correct answer, penalize.
+    start = time.perf_counter()
+    irrelevant = False
+    if correct_tokens and user_tokens:
+        unexpected_tokens = user_tokens - correct_tokens
+        irrelevance_ratio = len(unexpected_tokens) / len(user_tokens)
+
+        # If > 70% of words are unexpected, it's likely wrong context
+        if irrelevance_ratio > 0.7:
+            irrelevant = True
+        elif irrelevance_ratio > 0.5:
+            components['irrelevance'] = 0.3  # Moderate penalty
+    if stats is not None:
+        stats.record('irrelevance_gate', time.perf_counter() - start)
+    if irrelevant:
+        return _decide(components, 'irrelevance_gate', 0.1, stats)  # High Irrelevance Penalty
+
+    # Conceptual Score (Jaccard with Correction)
+    start = time.perf_counter()
+    if correct_tokens:
+        components['concept'] = len(user_tokens & correct_tokens) / len(correct_tokens)
+
+    # Question Awareness (Parrot Check)
+    q_tokens = analysis['question_tokens']
+    if q_tokens and user_tokens:
+        q_overlap = len(user_tokens & q_tokens)
+        # If user answer is MOSTLY question words (and short), it's a parrot
+        if len(user_tokens) < 10 and (q_overlap / len(user_tokens) > 0.7):
+            components['parrot'] = 0.2
+
+    if analysis['clean_user'] == analysis['clean_correct']:
+        # Verbatim answer: full sequence match, and both encodings are the same
+        # vector, so the neural score is its maximum
+        components['sequence'] = 1.0
+        lo = hi = float(combine_scores(components['concept'], 1.0, NEURAL_SCORE_BOUNDS[1],
+                                       components['parrot'], components['irrelevance']))
+    else:
+        lo, hi = score_bounds(components, sequence_known=False)
+    if stats is not None:
+        stats.record('concept', time.perf_counter() - start)
+    if hi - lo <= tolerance + CASCADE_EPSILON:
+        return _decide(components, 'concept', _pinned_score(lo, hi), stats)
+
+    # Sequence Match (Difflib)
+    start = time.perf_counter()
+    components['sequence'] = difflib.SequenceMatcher(
+        None, analysis['clean_user'], analysis['clean_correct']).ratio()
+
+    lo, hi = score_bounds(components, sequence_known=True)
+    if stats is not None:
+        stats.record('sequence', time.perf_counter() - start)
+    if hi - lo <= tolerance + CASCADE_EPSILON:
+        return _decide(components, 'sequence', _pinned_score(lo, hi), stats)
+
+    return components
+
+
+def combine_scores(concept, sequence, neural, parrot, irrelevance) -> np.ndarray:
+    """Vectorized synthesis of the scoring components into final scores"""
+    concept = np.asarray(concept, dtype=np.float64)
+
+    base_score = (concept * W_CONCEPT) + (np.asarray(sequence) * W_SEQ) + (np.asarray(neural) * W_NEURAL)
+
+    # Apply penalties
+    final_score = base_score * np.asarray(parrot) - np.asarray(irrelevance)
+
+    # Boost for perfect keyword match
+    final_score = np.where(concept > 0.9, np.maximum(final_score, 0.95), final_score)
+
+    return np.clip(final_score, 0.0, 1.0)
+
+
+def explain(analysis: Dict) -> str:
+    """Rule-based feedback for an analyzed answer pair"""
+    c_clean = analysis['display_correct']
+
+    # Handle empty/short answers
+    if not analysis['clean_user']:
+        return "You didn't provide an answer. The correct answer is essential to understand this concept."
+
+    # Check for Exact Match
+    if analysis['clean_user'] == analysis['clean_correct']:
+        return "Perfect! Your answer exactly matches what we were looking for."
+
+    # Keyword Analysis
+    user_tokens = analysis['user_tokens']
+    correct_tokens = analysis['correct_tokens']
+
+    missing_tokens = correct_tokens - user_tokens
+    extra_tokens = user_tokens - correct_tokens
+
+    explanation = []
+
+    # A. Completeness
+    if missing_tokens:
+        most_impt_missing = sorted(missing_tokens)[:3]  # Top 3
+        explanation.append(f"You missed key concepts like '{', '.join(most_impt_missing)}'.")
+
+    # B. Irrelevance
+    if extra_tokens and len(correct_tokens) > 0:
+        ratio = len(extra_tokens) / len(user_tokens)
+        if ratio > 0.5:
+            explanation.append("Your answer included information that wasn't quite relevant to the specific question.")
+
+    # C. Length/Depth
+    if len(user_tokens) < len(correct_tokens) * 0.5:
+        explanation.append("Your response was a bit too brief. Try to elaborate more to fully cover the topic.")
+
+    # D. Parrot Check (if question text available)
+    q_tokens = analysis['question_tokens']
+    if q_tokens and len(user_tokens) > 0 and len(user_tokens & q_tokens) / len(user_tokens) > 0.8:
+        explanation.append("It looks like you mostly repeated words from the question. Try to explain in your own words.")
+
+    if not explanation:
+        # Fallback for when tokens match well but maybe grammar/order is diff (or synonyms used that we didn't catch)
+        return f"Your answer is close! Compare it with the suggested answer to see the precise phrasing: '{c_clean}'."
+
+    # Final Assemblage
+    full_explanation = " ".join(explanation)
+    return f"{full_explanation} The correct answer is: '{c_clean}'."
+
+
+class CascadeStats:
+    """
+    Per-stage counters for the scoring cascade. Batch-local instances are
+    filled without locking and merged into the shared one once per batch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entered = dict.fromkeys(CASCADE_STAGES, 0)
+        self.decided = dict.fromkeys(CASCADE_STAGES, 0)
+        self.seconds = dict.fromkeys(CASCADE_STAGES, 0.0)
+
+    def record(self, stage: str, seconds: float, count: int = 1):
+        """Count `count` pairs entering a stage and the time spent in it"""
+        self.entered[stage] += count
+        self.seconds[stage] += seconds
+
+    def decide(self, stage: str):
+        """Count a pair whose final score was settled by a stage"""
+        self.decided[stage] += 1
+
+    def merge(self, other: 'CascadeStats'):
+        """Add the counters of a batch-local instance"""
+        with self._lock:
+            for stage in CASCADE_STAGES:
+                self.entered[stage] += other.entered[stage]
+                self.decided[stage] += other.decided[stage]
+                self.seconds[stage] += other.seconds[stage]
+
+    def reset(self):
+        with self._lock:
+            for stage in CASCADE_STAGES:
+                self.entered[stage] = 0
+                self.decided[stage] = 0
+                self.seconds[stage] = 0.0
+
+    def get_stats(self) -> Dict:
+        """Per-stage skip rate, decide count and time"""
+        with self._lock:
+            pairs = self.entered['normalize']
+            stages = {}
+            for stage in CASCADE_STAGES:
+                entered = self.entered[stage]
+                stages[stage] = {
+                    'entered': entered,
+                    'decided': self.decided[stage],
+                    'skip_rate': 1 - entered / pairs if pairs else 0.0,
+                    'total_ms': self.seconds[stage] * 1000,
+                    'avg_ms': self.seconds[stage] * 1000 / entered if entered else 0.0
+                }
+            return {
+                'pairs': pairs,
+                'encoder_skip_rate': stages['neural']['skip_rate'],
+                'stages': stages
+            }
+
+
+class AnswerScoringMixin:
+    """
+    Backend-independent scoring pipeline.
+    Subclasses provide `_encode(texts) -> np.ndarray` and call
+    `_init_scoring_caches` and `_init_cascade`.
+    """
+
+    def _init_scoring_caches(self, enable_cache: bool, cache_size: int, cache_ttl: int,
+                             verdict_cache_size: int = 4096):
+        # Reference answer embeddings (same handful of references per quiz)
+        self.reference_cache = TTLCache(
+            max_size=cache_size, ttl=cache_ttl, enabled=enable_cache)
+        # Prepared reference tokens + spelling index per question
+        self.reference_index_cache = TTLCache(
+            max_size=cache_size, ttl=cache_ttl, enabled=enable_cache)
+        # Question tokens for the parrot check
+        self.question_index_cache = TTLCache(
+            max_size=cache_size, ttl=cache_ttl, enabled=enable_cache)
+        # Final verdicts for duplicate (answer, reference, question) submissions
+        self.verdict_cache = TTLCache(
+            max_size=verdict_cache_size, ttl=cache_ttl, enabled=enable_cache)
+        self._fingerprint = None
+
+    def _invalidate_model_caches(self):
+        """Drop everything derived from encoder weights or vocabulary"""
+        self.reference_cache.clear()
+        self.verdict_cache.clear()
+        self._fingerprint = None
+
+    def _init_cascade(self, tolerance: float):
+        # Pairs whose final score is already fixed (or within `tolerance`, if > 0) skip the encoder
+        self.cascade_tolerance = tolerance
+        self.cascade_stats = CascadeStats()
+
+    def get_cascade_stats(self) -> Dict:
+        """Get per-stage skip rates and timings of the scoring cascade"""
+        stats = self.cascade_stats.get_stats()
+        stats['tolerance'] = self.cascade_tolerance
+        return stats
+
+    def _encoder_arrays(self) -> Optional[Tuple[List[str], List[np.ndarray]]]:
+        """Vocabulary and encoder weights, in export order (None: no fingerprint)"""
+        return None
+
+    def encoder_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the current encoder, recomputed after weight/vocabulary changes"""
+        if self._fingerprint is None:
+            arrays = self._encoder_arrays()
+            if arrays is not None:
+                self._fingerprint = encoder_fingerprint(*arrays)
+        return self._fingerprint
+
+    def encode_references(self, correct_answers: List[str]) -> np.ndarray:
+        """Reference embeddings as scoring computes them (from the normalized text)"""
+        return self._encode([normalize_text(str(answer)) for answer in correct_answers])
+
+    def _prepare_reference(self, correct_answer: str) -> Dict:
+        key = str(correct_answer)
+        reference = self.reference_index_cache.get(key)
+        if reference is None:
+            reference = prepare_reference(key)
+            self.reference_index_cache.put(key, reference)
+        return reference
+
+    def _prepare_question(self, question_text: str) -> Set[str]:
+        key = str(question_text)
+        tokens = self.question_index_cache.get(key)
+        if tokens is None:
+            tokens = question_tokens(key)
+            self.question_index_cache.put(key, tokens)
+        return tokens
+
+    def load_question_features(self, questions: List[Dict]) -> int:
+        """
+        Seed the reference / question / embedding caches from the fields
+        precompute_questions.py stored on question documents (features are
+        popped off the dicts). Returns how many questions had current features.
+        """
+        fingerprint = None
+        loaded = 0
+        for question in questions:
+            features = question.pop(FEATURES_FIELD, None)
+            question_text = question.get('question_text', '')
+            correct_answer = question.get('correct_answer', '')
+            if not features_match(features, question_text, correct_answer):
+                continue
+
+            correct_tokens = set(features['correct_tokens'])
+            self.reference_index_cache.put(
+                str(correct_answer), _reference(correct_answer, features['clean_correct'], correct_tokens))
+            self.question_index_cache.put(str(question_text), set(features['question_tokens']))
+
+            # Embeddings are only valid for the encoder that produced them
+            embedding = features.get('reference_embedding')
+            if embedding is not None:
+                if fingerprint is None:
+                    fingerprint = self.encoder_fingerprint() or ''
+                if fingerprint and features.get('encoder') == fingerprint:
+                    self.reference_cache.put(self._reference_key(features['clean_correct']),
+                                             np.asarray(embedding, dtype=np.float32))
+            loaded += 1
+        return loaded
+
+    @staticmethod
+    def _reference_key(clean_reference: str) -> str:
+        """Cache key for a normalized reference answer"""
+        return hashlib.sha1(clean_reference.encode('utf-8')).hexdigest()
+
+    def get_cache_stats(self) -> Dict:
+        """Get reference embedding / reference index / question index / verdict cache statistics"""
+        return {
+            'reference_embeddings': self.reference_cache.get_stats(),
+            'reference_index': self.reference_index_cache.get_stats(),
+            'question_index': self.question_index_cache.get_stats(),
+            'verdicts': self.verdict_cache.get_stats()
+        }
+
+    @staticmethod
+    def _verdict_key(user_answer: str, correct_answer: str, question_text: str = "") -> Tuple[str, str, str]:
+        """Answers that normalize identically share a verdict"""
+        return (
+            normalize_text(str(user_answer)),
+            str(correct_answer),
+            normalize_text(str(question_text)) if question_text else ""
+        )
+
+    def score_answer(self, user_answer: str, correct_answer: str, question_text: str = "") -> float:
+        """
+        Hybrid Scoring: Neural Vector + Conceptual Keyphrase Matching
+        Ensures valid answers get points even if untrained neural vectors miss them.
+        """
+        return self._verdicts([user_answer], [correct_answer], [question_text])[0]['score']
+
+    def generate_explanation(self, user_answer: str, correct_answer: str, question_text: str = "") -> str:
+        """
+        Generate a detailed explanation for the student's answer using rule-based logic.
+        """
+        verdict = self.verdict_cache.get(self._verdict_key(user_answer, correct_answer, question_text))
+        if verdict is not None:
+            return verdict['explanation']
+        return explain(analyze_pair(user_answer, correct_answer, question_text,
+                                    reference=self._prepare_reference(correct_answer),
+                                    question_token_set=self._prepare_question(question_text)))
+
+    def score_and_explain(self, user_answer: str, correct_answer: str, question_text: str = "") -> Dict:
+        """Score, component breakdown and explanation from one shared tokenization"""
+        return self.score_and_explain_batch([user_answer], [correct_answer], [question_text])[0]
+
+    def score_and_explain_batch(self, user_answers: List[str], correct_answers: List[str],
+                                question_texts: Optional[List[str]] = None) -> List[Dict]:
+        """Batched score_and_explain (one encoder invocation for the whole batch)"""
+        # Verdicts are shared with the memo: hand out copies
+        return [
+            {**verdict, 'components': dict(verdict['components'])}
+            for verdict in self._verdicts(user_answers, correct_answers, question_texts)
+        ]
+
+    def score_answers_batch(self, user_answers: List[str], correct_answers: List[str],
+                            question_texts: Optional[List[str]] = None) -> List[float]:
+        """
+        Score multiple answers with one tokenization pass per pair and a single
+        encoder invocation over all user answers and all unique reference answers
+        """
+        return [verdict['score'] for verdict in self._verdicts(user_answers, correct_answers, question_texts)]
+
+    def _verdicts(self, user_answers: List[str], correct_answers: List[str],
+                  question_texts: Optional[List[str]] = None) -> List[Dict]:
+        """Memoized verdicts; each distinct missing key is scored once per batch"""
+        if question_texts is None:
+            question_texts = [""] * len(user_answers)
+
+        keys = [self._verdict_key(u, c, q) for u, c, q in zip(user_answers, correct_answers, question_texts)]
+        verdicts = {}
+        missing = {}  # key -> first position in the batch
+        for i, key in enumerate(keys):
+            if key in verdicts or key in missing:
+                continue
+            verdict = self.verdict_cache.get(key)
+            if verdict is None:
+                missing[key] = i
+            else:
+                verdicts[key] = verdict
+
+        if missing:
+            positions = list(missing.values())
+            stats = CascadeStats()
+            analyses = self._analyze_batch(
+                [user_answers[i] for i in positions],
+                [correct_answers[i] for i in positions],
+                [question_texts[i] for i in positions],
+                stats
+            )
+            scores, components = self._score_analyses(analyses, stats)
+            for key, score, comp, analysis in zip(missing, scores, components, analyses):
+                verdict = {'score': score, 'components': comp, 'explanation': explain(analysis)}
+                self.verdict_cache.put(key, verdict)
+                verdicts[key] = verdict
+
+        return [verdicts[key] for key in keys]
+
+    def _analyze_batch(self, user_answers: List[str], correct_answers: List[str],
+                       question_texts: Optional[List[str]] = None,
+                       stats: Optional[CascadeStats] = None) -> List[Dict]:
+        if question_texts is None:
+            question_texts = [""] * len(user_answers)
+        return [
+            analyze_pair(u, c, q, reference=self._prepare_reference(c), stats=stats,
+                         question_token_set=self._prepare_question(q))
+            for u, c, q in zip(user_answers, correct_answers, question_texts)
+        ]
+
+    def _score_analyses(self, analyses: List[Dict],
+                        stats: Optional[CascadeStats] = None) -> Tuple[List[float], List[Dict]]:
+        """Lexical cascade per pair, then one encoder pass for undecided pairs"""
+        if stats is None:
+            stats = CascadeStats()
+        components = [
+            lexical_components(analysis, self.cascade_tolerance, stats)
+            for analysis in analyses
+        ]
+        scores = np.array([comp['early_score'] or 0.0 for comp in components])
+        neural = [None] * len(analyses)
+
+        # Only pairs not decided lexically need the neural score
+        pending = [i for i, comp in enumerate(components) if comp['early_score'] is None]
+        if pending:
+            start = time.perf_counter()
+            clean_corrects = [analyses[i]['clean_correct'] for i in pending]
+            pending_users = [analyses[i]['clean_user'] for i in pending]
+            unique_refs = list(dict.fromkeys(clean_corrects))
+
+            # Reference embeddings come from the cache; only misses are encoded
+            ref_vectors = {ref: self.reference_cache.get(self._reference_key(ref)) for ref in unique_refs}
+            missing_refs = [ref for ref, vec in ref_vectors.items() if vec is None]
+
+            # One encoder pass over stacked user + uncached reference answers
+            vectors = self._encode(pending_users + missing_refs)
+            user_vecs = vectors[:len(pending_users)]
+            for ref, vec in zip(missing_refs, vectors[len(pending_users):]):
+                ref_vectors[ref] = vec.copy()
+                self.reference_cache.put(self._reference_key(ref), ref_vectors[ref])
+
+            ref_vecs = np.stack([ref_vectors[ref] for ref in clean_corrects])
+
+            neural_scores = cosine_scores(user_vecs, ref_vecs)
+
+            pending_components = [components[i] for i in pending]
+            scores[pending] = combine_scores(
+                concept=[comp['concept'] for comp in pending_components],
+                sequence=[comp['sequence'] for comp in pending_components],
+                neural=neural_scores,
+                parrot=[comp['parrot'] for comp in pending_components],
+                irrelevance=[comp['irrelevance'] for comp in pending_components]
+            )
+            for i, value in zip(pending, neural_scores):
+                neural[i] = float(value)
+            stats.record('neural', time.perf_counter() - start, count=len(pending))
+
+        breakdown = []
+        for comp, neural_score in zip(components, neural):
+            breakdown.append({
+                'concept': float(comp['concept']),
+                'sequence': float(comp['sequence']),
+                'neural': neural_score,
+                'parrot_penalty': float(comp['parrot']),
+                'irrelevance_penalty': float(comp['irrelevance']),
+                'decided_lexically': comp['early_score'] is not None,
+                'decided_at': comp['decided_at'] or 'neural'
+            })
+
+        self.cascade_stats.merge(stats)
+        return [float(s) for s in scores], breakdown
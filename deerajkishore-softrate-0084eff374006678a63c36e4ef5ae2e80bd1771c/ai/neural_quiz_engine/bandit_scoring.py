@@ -2,60 +2,200 @@
 Bandit Scoring Brain - Neural Contextual Bandit
 Adaptive scoring using reinforcement learning
 """
+import json
+import queue
+import threading
+import time
+from datetime import datetime
 import tensorflow as tf
 import numpy as np
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
+
+from bandit_stats import ShardedArmStats
+from linucb import LinUCB
+
+# Context columns read by the scoring curve (see create_context_vector)
+SIMILARITY_COLUMN = 0
+TIME_BONUS_COLUMN = 5
+
+# LinUCB observations drained and applied together by the update worker
+MAX_UPDATE_BATCH = 1024
+
+
+# Arm descriptions, from the strictest scoring curve to the most lenient
+ARM_DESCRIPTIONS = (
+    "Conservative Scoring (High threshold)",
+    "Balanced Scoring (Medium threshold)",
+    "Liberal Scoring (Rewards partial answers)"
+)
+
+
+def arm_descriptions(num_arms: int) -> List[str]:
+    """One description per arm (arm 0 strictest), for any NUM_ARMS"""
+    if num_arms == len(ARM_DESCRIPTIONS):
+        return list(ARM_DESCRIPTIONS)
+    if num_arms == 1:
+        return [ARM_DESCRIPTIONS[1]]
+    return [
+        f"{ARM_DESCRIPTIONS[round(2 * i / (num_arms - 1))]} [arm {i + 1}/{num_arms}]"
+        for i in range(num_arms)
+    ]
+
+
+def strategy_scores(similarity: np.ndarray, num_arms: int) -> np.ndarray:
+    """
+    Fixed per-arm score curves used by the LinUCB engine, (N, num_arms):
+    similarity ** p with p from 2 (conservative) down to 0.5 (liberal)
+    """
+    exponents = np.geomspace(2.0, 0.5, num_arms) if num_arms > 1 else np.ones(1)
+    similarity = np.clip(np.asarray(similarity, dtype=np.float64), 0.0, 1.0)
+    return similarity[:, None] ** exponents[None, :]
+
+
+def apply_scoring_curve(raw_scores: np.ndarray, similarity: np.ndarray,
+                        time_bonus: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized gating + boost curve on top of the selected arm's raw scores.
+    Returns (final_scores, gated) where gated marks zero-tolerance rows.
+    """
+    raw = np.asarray(raw_scores, dtype=np.float64)
+    similarity = np.asarray(similarity, dtype=np.float64)
+    time_bonus = np.asarray(time_bonus, dtype=np.float64)
+
+    # --- ZERO TOLERANCE CLAMP ---
+    # If the semantic similarity is very low, the bandit should NOT
+    # inflate the score based on other context factors.
+    gated = similarity < 0.15
+
+    # --- AGGRESSIVE GENEROSITY BOOST ---
+    # Push reasonable answers (>0.4) to high scores (>0.75)
+    floor = np.select(
+        [similarity >= 0.85, similarity >= 0.7, similarity >= 0.5, similarity >= 0.35],
+        [1.0, 0.95, 0.85, 0.70],
+        default=-np.inf
+    )
+    raw = np.where(similarity >= 0.85, 1.0, np.maximum(raw, floor))
+
+    # Normalize: If raw_score implies high confidence, ignore lower bandit output
+    raw = np.where(similarity > 0.6, np.maximum(raw, similarity * 1.3), raw)
+
+    # Apply time bonus
+    final = np.minimum(1.0, raw + time_bonus)
+
+    # Ensure final score doesn't drop below similarity significantly
+    final = np.where(final < similarity * 0.9, similarity, final)
+
+    return np.where(gated, similarity, final), gated
+
+
+class FusedArmHeads(tf.keras.layers.Layer):
+    """
+    All bandit arms as one layer: a single (features, arms * hidden) matmul
+    followed by a per-arm output projection, (batch, features) -> (batch, arms)
+    """
+
+    def __init__(self, num_arms: int, hidden_units: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self.num_arms = num_arms
+        self.hidden_units = hidden_units
+
+    def build(self, input_shape):
+        features = input_shape[-1]
+        self.hidden_kernel = self.add_weight(
+            name='hidden_kernel', shape=(features, self.num_arms * self.hidden_units),
+            initializer='glorot_uniform')
+        self.hidden_bias = self.add_weight(
+            name='hidden_bias', shape=(self.num_arms * self.hidden_units,), initializer='zeros')
+        self.output_kernel = self.add_weight(
+            name='output_kernel', shape=(self.num_arms, self.hidden_units),
+            initializer='glorot_uniform')
+        self.output_bias = self.add_weight(
+            name='output_bias', shape=(self.num_arms,), initializer='zeros')
+
+    def call(self, x):
+        hidden = tf.nn.relu(tf.matmul(x, self.hidden_kernel) + self.hidden_bias)
+        hidden = tf.reshape(hidden, (-1, self.num_arms, self.hidden_units))
+        logits = tf.einsum('bah,ah->ba', hidden, self.output_kernel) + self.output_bias
+        return tf.sigmoid(logits)
 
 
 class BanditScoringBrain(tf.keras.Model):
     """Neural Contextual Bandit for adaptive scoring"""
 
-    def __init__(self, context_size: int = 6, num_arms: int = 3):
+    def __init__(self, context_size: int = 6, num_arms: int = 3,
+                 engine: str = 'neural', linucb_alpha: float = 1.0,
+                 merge_interval: float = 1.0):
         super().__init__()
 
+        if num_arms < 1:
+            raise ValueError(f"Bandit needs at least one arm, got {num_arms}")
         self.num_arms = num_arms
         self.context_size = context_size
 
+        # 'neural': network arms + epsilon-greedy; 'linucb': fixed strategy curves chosen by
+        # LinUCB, trained only on external feedback passed to record_rewards with its contexts
+        self.engine = engine.lower()
+        if self.engine not in ('neural', 'linucb'):
+            raise ValueError(f"Unknown bandit engine: {engine}")
+        self.linucb = LinUCB(num_arms, context_size, alpha=linucb_alpha)
+
         # Context processing
         self.context_norm = tf.keras.layers.BatchNormalization()
         self.dense1 = tf.keras.layers.Dense(32, activation='relu')
         self.dense2 = tf.keras.layers.Dense(16, activation='relu')
 
-        # Bandit arms (scoring strategies)
-        self.arms = []
-        for _ in range(num_arms):
-            arm = tf.keras.Sequential([
-                tf.keras.layers.Dense(8, activation='relu'),
-                tf.keras.layers.Dense(1, activation='sigmoid')
-            ])
-            self.arms.append(arm)
+        # Bandit arms (scoring strategies), evaluated together
+        self.arm_heads = FusedArmHeads(num_arms, hidden_units=8)
 
-        # Exploration parameters
-        self.epsilon = 0.2  # Exploration rate
-        self.arm_counts = tf.Variable(tf.zeros(num_arms), trainable=False)
-        self.arm_rewards = tf.Variable(tf.zeros(num_arms), trainable=False)
+        # Exploration parameters + arm statistics: each request thread writes
+        # its own shard, the update worker merges them into a global snapshot
+        self.stats = ShardedArmStats(num_arms, epsilon=0.2)  # Exploration rate
+        self.merge_interval = merge_interval
+
+        # Build weights up front so concurrent first requests don't race to create them
+        self.arm_scores(tf.zeros((1, context_size)))
+
+        # Inference path: frozen BatchNorm, traced once for any batch size
+        self._infer = tf.function(
+            lambda context: self.arm_scores(context, training=False),
+            input_signature=[tf.TensorSpec(shape=[None, context_size], dtype=tf.float32)]
+        )
+
+        # Exploration draws use a per-thread NumPy RNG (Generator is not thread-safe)
+        self._local = threading.local()
+
+        # LinUCB matrices have a single writer: the background worker
+        self._updates = queue.Queue()
+
+        # Periodic checkpoints of the arm statistics (see enable_checkpointing)
+        self.state_id = 'answer_bandit'
+        self._store = None
+        self._checkpoint_interval = None
+        self._last_checkpoint = time.monotonic()
+        self._checkpointed_updates = 0.0
+        self._worker = threading.Thread(target=self._apply_updates, name="bandit-updates", daemon=True)
+        self._worker.start()
 
         # Arm descriptions
-        self.arm_descriptions = [
-            "Conservative Scoring (High threshold)",
-            "Balanced Scoring (Medium threshold)",
-            "Liberal Scoring (Rewards partial answers)"
-        ]
+        self.arm_descriptions = arm_descriptions(num_arms)
 
-    def call(self, context: tf.Tensor, training=False) -> Tuple[List[tf.Tensor], tf.Tensor]:
-        """Process context through all arms"""
-        x = self.context_norm(context)
+    def arm_scores(self, context: tf.Tensor, training=False) -> tf.Tensor:
+        """Scores of every arm for every row, (batch, num_arms)"""
+        x = self.context_norm(context, training=training)
         x = self.dense1(x)
         x = self.dense2(x)
+        return self.arm_heads(x)
 
-        # Get predictions from all arms
-        predictions = [arm(x) for arm in self.arms]
+    def call(self, context: tf.Tensor, training=False) -> Tuple[List[tf.Tensor], tf.Tensor]:
+        """Process context through all arms"""
+        # Get predictions from all arms, one (batch, 1) tensor per arm
+        predictions = tf.split(self.arm_scores(context, training=training), self.num_arms, axis=1)
 
         if training:
             # Epsilon-greedy exploration
             if tf.random.uniform(()) < self.epsilon:
                 arm_idx = tf.random.uniform(
-                    (), 0, len(self.arms), dtype=tf.int32)
+                    (), 0, self.num_arms, dtype=tf.int32)
             else:
                 # Choose arm with highest average prediction
                 avg_predictions = [tf.reduce_mean(p) for p in predictions]
@@ -67,104 +207,177 @@ class BanditScoringBrain(tf.keras.Model):
 
         return predictions, arm_idx
 
+    @property
+    def epsilon(self) -> float:
+        """Exploration rate of the last merged snapshot"""
+        return self.stats.epsilon
+
     def score_answer(self, similarity: float, difficulty: float,
                      time_taken: float, topic_mastery: float,
                      previous_performance: float, time_bonus: float = 0.0) -> Tuple[float, int, str]:
-        """Score an answer using bandit logic"""
-        # Create context vector
-        context = self.create_context_vector(
-            similarity, difficulty, time_taken,
-            topic_mastery, previous_performance, time_bonus
+        """Score an answer using bandit logic (inference path, see score_batch)"""
+        context = self.create_context_matrix(
+            [similarity], [difficulty], [time_taken],
+            [topic_mastery], [previous_performance], [time_bonus]
         )
+        scores, arm_indices, descriptions = self.score_batch(context)
+        return float(scores[0]), int(arm_indices[0]), descriptions[0]
+
+    def score_batch(self, contexts: np.ndarray, explore: bool = True) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Score N answers in one bandit invocation.
+        contexts: (N, context_size) rows built by create_context_matrix.
+        Returns (final_scores, arm_indices, arm_descriptions).
+        """
+        # Thresholds are applied to the float64 columns, the network sees float32
+        contexts = np.asarray(contexts, dtype=np.float64).reshape(-1, self.context_size)
+        n = len(contexts)
+        if n == 0:
+            return np.zeros(0), np.zeros(0, dtype=np.int64), []
+
+        similarity = contexts[:, SIMILARITY_COLUMN]
+        exploring = np.zeros(n, dtype=bool)
+
+        if self.engine == 'linucb':
+            # Pure NumPy: UCB selection explores by itself
+            arm_scores = strategy_scores(similarity, self.num_arms)
+            arm_indices = self.linucb.select(contexts)
+        else:
+            # Every arm for every row in a single forward pass (inference mode)
+            arm_scores = self._infer(tf.constant(contexts, dtype=tf.float32)).numpy()
+            arm_indices = np.argmax(arm_scores, axis=1)
+
+        if explore and self.engine == 'neural':
+            # Per-row epsilon-greedy, drawn outside TF
+            rng = self._thread_rng()
+            exploring = rng.random(n) < self.epsilon
+            arm_indices = np.where(exploring, rng.integers(0, self.num_arms, size=n), arm_indices)
+
+        raw_scores = arm_scores[np.arange(n), arm_indices]
+        time_bonus = contexts[:, TIME_BONUS_COLUMN] if self.context_size > TIME_BONUS_COLUMN else np.zeros(n)
+        final_scores, gated = apply_scoring_curve(raw_scores, similarity, time_bonus)
+
+        # Selection bookkeeping goes to this thread's shard; rewards only come
+        # from real feedback (update_reward / record_rewards), never from the inputs
+        self.stats.record(arm_indices, exploring, np.full(n, np.nan))
+
+        descriptions = [
+            self.arm_descriptions[arm] + (" [GATED]" if is_gated else "")
+            for arm, is_gated in zip(arm_indices, gated)
+        ]
+        return final_scores, arm_indices, descriptions
+
+    def _thread_rng(self) -> np.random.Generator:
+        rng = getattr(self._local, 'rng', None)
+        if rng is None:
+            rng = self._local.rng = np.random.default_rng()
+        return rng
+
+    def _queue_observations(self, arm_indices: np.ndarray, contexts: np.ndarray, rewards: np.ndarray):
+        """Hand rewarded (arm, context, reward) rows to the LinUCB writer"""
+        rewarded = ~np.isnan(rewards)
+        if rewarded.any():
+            self._updates.put((arm_indices[rewarded], contexts[rewarded], rewards[rewarded]))
+
+    def _apply_updates(self):
+        """Background worker: apply LinUCB observations, merge shards every interval, checkpoint"""
+        while True:
+            events = []
+            try:
+                events.append(self._updates.get(timeout=self.merge_interval))
+            except queue.Empty:
+                pass
+            while events and len(events) < MAX_UPDATE_BATCH:
+                try:
+                    events.append(self._updates.get_nowait())
+                except queue.Empty:
+                    break
 
-        # Get bandit predictions
-        predictions, arm_idx = self(context, training=True)
-
-        # Get score from selected arm
-        raw_score = float(predictions[arm_idx].numpy()[0][0])
-        
-        # --- ZERO TOLERANCE CLAMP ---
-        # If the semantic similarity is very low, the bandit should NOT 
-        # inflate the score based on other context factors.
-        if similarity < 0.15:
-             final_score = similarity # Pass through the raw low score (likely 0.0)
-             arm_desc = self.arm_descriptions[int(arm_idx.numpy())] + " [GATED]"
-             return final_score, int(arm_idx.numpy()), arm_desc
-        # ----------------------------
-
-        # --- ENCOURAGING BOOST ---
-        # User Feedback: "give them score like 0.8 or 0.9"
-        # If similarity is high, we force the score to be high regardless of the bandit arm's opinion (time penalty etc)
-        
-        # --- AGGRESSIVE GENEROSITY BOOST (User Request) ---
-        # The user wants "very excellent" scoring. 
-        # We apply a curve that pushes reasonable answers (>0.4) to high scores (>0.75).
-        
-        if similarity >= 0.85:
-             # Almost perfect -> Full marks
-             raw_score = 1.0
-        elif similarity >= 0.7:
-             # Good match -> Excellent score
-             raw_score = max(raw_score, 0.95)
-        elif similarity >= 0.5:
-             # Decent match -> Very Good score
-             raw_score = max(raw_score, 0.85)
-        elif similarity >= 0.35:
-             # Partially relevant -> Good score (Passing)
-             raw_score = max(raw_score, 0.70)
-             
-        # Normalize: If raw_score implies high confidence, ignore lower bandit output
-        if similarity > 0.6:
-            raw_score = max(raw_score, similarity * 1.3) # 30% boost
-
-        # Apply time bonus
-        final_score = min(1.0, raw_score + time_bonus)
-        
-        # Ensure final score doesn't drop below similarity significantly
-        if final_score < similarity * 0.9:
-             final_score = similarity
-             
-        arm_idx_int = int(arm_idx.numpy())
-
-        return final_score, arm_idx_int, self.arm_descriptions[arm_idx_int]
+            try:
+                for arm_indices, contexts, rewards in events:
+                    self.linucb.update(arm_indices, contexts, rewards)
+                self.stats.merge()
+                if self._store is not None and self.stats.total_updates != self._checkpointed_updates and \
+                        time.monotonic() - self._last_checkpoint >= self._checkpoint_interval:
+                    self.checkpoint()
+            except Exception as e:
+                print(f"⚠️  Bandit update failed: {e}")
+            finally:
+                for _ in events:
+                    self._updates.task_done()
+
+    def flush_updates(self):
+        """Block until queued LinUCB updates are applied, then merge every shard"""
+        self._updates.join()
+        self.stats.merge()
 
     def create_context_vector(self, similarity: float, difficulty: float,
                               time_taken: float, topic_mastery: float,
                               previous_performance: float, time_bonus: float = 0.0) -> tf.Tensor:
         """Create context vector for bandit"""
-        context_values = [
-            similarity,                    # Semantic similarity score
-            difficulty,                    # Question difficulty
-            np.log1p(time_taken) / 10,    # Log normalized time
-            topic_mastery,                # User's mastery of topic
-            previous_performance,         # User's historical performance
-            time_bonus                    # Time efficiency bonus
+        return tf.constant(self.create_context_matrix(
+            [similarity], [difficulty], [time_taken],
+            [topic_mastery], [previous_performance], [time_bonus]
+        ), dtype=tf.float32)
+
+    def create_context_matrix(self, similarity, difficulty, time_taken, topic_mastery,
+                              previous_performance, time_bonus=None) -> np.ndarray:
+        """Vectorized create_context_vector: (N, context_size)"""
+        similarity = np.asarray(similarity, dtype=np.float64)
+        if time_bonus is None:
+            time_bonus = np.zeros_like(similarity)
+
+        columns = [
+            similarity,                                 # Semantic similarity score
+            difficulty,                                 # Question difficulty
+            np.log1p(np.asarray(time_taken, dtype=np.float64)) / 10,  # Log normalized time
+            topic_mastery,                              # User's mastery of topic
+            previous_performance,                       # User's historical performance
+            time_bonus                                  # Time efficiency bonus
         ]
 
         # Ensure correct length
-        context_values = context_values[:self.context_size]
-        context_values.extend(
-            [0.0] * (self.context_size - len(context_values)))
+        columns = columns[:self.context_size]
+        context = np.zeros((len(similarity), self.context_size))
+        for i, column in enumerate(columns):
+            context[:, i] = column
+        return context
 
-        return tf.constant([context_values], dtype=tf.float32)
+    def update_reward(self, arm_idx: int, reward: float, context: Optional[np.ndarray] = None):
+        """Queue external reward feedback (applied asynchronously)"""
+        self.record_rewards([arm_idx], [reward], None if context is None else [context])
 
-    def update_reward(self, arm_idx: int, reward: float):
-        """Update bandit with reward feedback"""
-        # Update counts and rewards
-        one_hot = tf.one_hot(arm_idx, self.num_arms)
-        self.arm_counts.assign_add(one_hot)
-        self.arm_rewards.assign_add(one_hot * reward)
+    def record_rewards(self, arm_indices: List[int], rewards: List[float], contexts: Optional[np.ndarray] = None):
+        """
+        Record a batch of (arm, reward) feedback events, e.g. instructor
+        regrades (see record_regrades). This is the only way LinUCB learns:
+        it needs the contexts the arms were selected with, and the reward
+        must come from outside the scoring inputs.
+        """
+        arm_indices = np.asarray(arm_indices, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        self.stats.record(arm_indices, None, rewards)
+        if self.engine == 'linucb' and contexts is not None:
+            contexts = np.asarray(contexts, dtype=np.float64).reshape(-1, self.context_size)
+            self._queue_observations(arm_indices, contexts, rewards)
 
-        # Decay epsilon over time (less exploration as we learn)
-        self.epsilon *= 0.995
-        self.epsilon = max(0.05, self.epsilon)  # Maintain minimum exploration
+    def record_regrades(self, arm_indices: List[int], contexts: np.ndarray,
+                        served_scores: List[float], corrected_scores: List[float]):
+        """
+        Instructor regrades as feedback: an arm is rewarded by how close the
+        score it served came to the corrected score (1.0 = exact agreement)
+        """
+        served = np.asarray(served_scores, dtype=np.float64)
+        corrected = np.clip(np.asarray(corrected_scores, dtype=np.float64), 0.0, 1.0)
+        self.record_rewards(arm_indices, 1.0 - np.abs(served - corrected), contexts)
 
     def get_arm_statistics(self) -> Dict:
-        """Get statistics for each arm"""
+        """Get statistics for each arm (as of the last merge)"""
+        snapshot = self.stats.snapshot
         stats = []
         for i in range(self.num_arms):
-            count = float(self.arm_counts[i].numpy())
-            reward = float(self.arm_rewards[i].numpy())
+            count = float(snapshot['arm_counts'][i])
+            reward = float(snapshot['arm_rewards'][i])
 
             avg_reward = reward / count if count > 0 else 0
 
@@ -172,6 +385,7 @@ class BanditScoringBrain(tf.keras.Model):
                 'arm_id': i,
                 'name': self.arm_descriptions[i],
                 'selection_count': count,
+                'times_selected': int(snapshot['selection_counts'][i]),
                 'total_reward': reward,
                 'avg_reward': avg_reward,
                 # Confidence based on usage
@@ -179,30 +393,94 @@ class BanditScoringBrain(tf.keras.Model):
             })
 
         return {
+            'engine': self.engine,
             'arms': stats,
-            'exploration_rate': float(self.epsilon),
-            'total_selections': float(tf.reduce_sum(self.arm_counts).numpy())
+            'exploration_rate': float(snapshot['epsilon']),
+            'explorations': snapshot['exploration_count'],
+            'total_selections': float(snapshot['arm_counts'].sum()),
+            'merged_at': datetime.fromtimestamp(snapshot['merged_at']).isoformat()
+        }
+
+    def get_state(self) -> Dict:
+        """Serializable arm statistics (shared by file and MongoDB checkpoints)"""
+        snapshot = self.stats.merge()
+        return {
+            'engine': self.engine,
+            'linucb': self.linucb.get_state(),
+            'num_arms': self.num_arms,
+            'arm_counts': snapshot['arm_counts'].tolist(),
+            'arm_rewards': snapshot['arm_rewards'].tolist(),
+            'selection_counts': snapshot['selection_counts'].tolist(),
+            'exploration_count': snapshot['exploration_count'],
+            'epsilon': float(snapshot['epsilon']),
+            'updated_at': datetime.now().isoformat()
         }
 
+    def set_state(self, state: Dict) -> bool:
+        """Restore arm statistics; ignores checkpoints for a different arm count"""
+        if len(state.get('arm_counts', [])) != self.num_arms:
+            print(f"⚠️  Bandit checkpoint has {len(state.get('arm_counts', []))} arms, expected {self.num_arms}")
+            return False
+
+        self.stats.restore(
+            state.get('selection_counts', [0.0] * self.num_arms),
+            state.get('exploration_count', 0),
+            state['arm_counts'],
+            state['arm_rewards'],
+            state['epsilon']
+        )
+        self._checkpointed_updates = self.stats.total_updates
+        # Arm counts carry over between engines, learned models only within one
+        if state.get('engine', 'neural') == self.engine and 'linucb' in state:
+            try:
+                self.linucb.set_state(state['linucb'])
+            except ValueError as e:
+                print(f"⚠️  {e}")
+        return True
+
+    def enable_checkpointing(self, collection, interval: float = 60.0, state_id: str = 'answer_bandit') -> bool:
+        """
+        Warm-start from the latest MongoDB checkpoint, then let the update
+        worker write a new one at most every `interval` seconds
+        """
+        self.state_id = state_id
+        restored = False
+        try:
+            state = collection.find_one({'_id': state_id})
+            if state:
+                restored = self.set_state(state)
+        except Exception as e:
+            print(f"⚠️  Could not load bandit checkpoint: {e}")
+
+        self._checkpoint_interval = interval
+        self._last_checkpoint = time.monotonic()
+        self._store = collection
+        return restored
+
+    def checkpoint(self):
+        """Write the current arm statistics to MongoDB"""
+        if self._store is None:
+            return
+        state = self.get_state()
+        self._store.replace_one({'_id': self.state_id}, state, upsert=True)
+        self._last_checkpoint = time.monotonic()
+        self._checkpointed_updates = sum(state['selection_counts']) + sum(state['arm_counts'])
+
+    def close(self):
+        """Apply pending updates and write a final checkpoint"""
+        self.flush_updates()
+        if self._store is not None and self.stats.total_updates != self._checkpointed_updates:
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"⚠️  Could not save bandit checkpoint: {e}")
+
     def save_state(self, filepath: str):
         """Save bandit state to file"""
-        state = {
-            'arm_counts': self.arm_counts.numpy().tolist(),
-            'arm_rewards': self.arm_rewards.numpy().tolist(),
-            'epsilon': float(self.epsilon)
-        }
-        import json
         with open(filepath, 'w') as f:
-            json.dump(state, f)
+            json.dump(self.get_state(), f)
 
     def load_state(self, filepath: str):
         """Load bandit state from file"""
-        import json
         with open(filepath, 'r') as f:
-            state = json.load(f)
-
-        self.arm_counts.assign(tf.constant(
-            state['arm_counts'], dtype=tf.float32))
-        self.arm_rewards.assign(tf.constant(
-            state['arm_rewards'], dtype=tf.float32))
-        self.epsilon = state['epsilon']
+            self.set_state(json.load(f))
@@ -0,0 +1,138 @@
+"""
+Bandit Stats - Per-thread sharded arm statistics
+Request threads write only their own shard (no locks); a single merger
+folds all shards into an immutable snapshot that readers use.
+"""
+import threading
+import time
+import numpy as np
+from typing import Dict, Optional
+
+
+class _Shard:
+    """Cumulative counters written only by their owning thread"""
+
+    def __init__(self, num_arms: int):
+        self.selections = np.zeros(num_arms)
+        self.explorations = 0
+        self.reward_counts = np.zeros(num_arms)
+        self.reward_sums = np.zeros(num_arms)
+
+
+class ShardedArmStats:
+    """
+    Arm selection / reward statistics for the FastAPI thread pool.
+    Shards only grow, so a merge that races with a writer is merely a
+    little stale, never inconsistent.
+    """
+
+    def __init__(self, num_arms: int, epsilon: float = 0.2,
+                 min_epsilon: float = 0.05, epsilon_decay: float = 0.995):
+        self.num_arms = num_arms
+        self.min_epsilon = min_epsilon
+        self.epsilon_decay = epsilon_decay
+
+        self._local = threading.local()
+        self._shards = []
+        self._register_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+
+        # Restored totals (checkpoint) that the shards are added to
+        self._base = {
+            'selections': np.zeros(num_arms),
+            'explorations': 0,
+            'reward_counts': np.zeros(num_arms),
+            'reward_sums': np.zeros(num_arms)
+        }
+        # Epsilon decays per reward observed after the anchor point
+        self._base_epsilon = epsilon
+        self._epsilon_anchor = 0.0
+
+        self.snapshot = self._compose(self._base, epsilon)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(self.num_arms)
+            with self._register_lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, arm_indices: np.ndarray, exploring: Optional[np.ndarray], rewards: np.ndarray):
+        """Lock-free update of the calling thread's shard"""
+        shard = self._shard()
+        arm_indices = np.asarray(arm_indices, dtype=np.int64)
+        if exploring is not None:
+            np.add.at(shard.selections, arm_indices, 1)
+            shard.explorations += int(np.sum(exploring))
+
+        rewards = np.asarray(rewards, dtype=np.float64)
+        rewarded = ~np.isnan(rewards)
+        np.add.at(shard.reward_counts, arm_indices[rewarded], 1)
+        np.add.at(shard.reward_sums, arm_indices[rewarded], rewards[rewarded])
+
+    def _totals(self) -> Dict:
+        with self._register_lock:
+            shards = list(self._shards)
+        totals = {
+            'selections': self._base['selections'].copy(),
+            'explorations': self._base['explorations'],
+            'reward_counts': self._base['reward_counts'].copy(),
+            'reward_sums': self._base['reward_sums'].copy()
+        }
+        for shard in shards:
+            totals['selections'] += shard.selections
+            totals['explorations'] += shard.explorations
+            totals['reward_counts'] += shard.reward_counts
+            totals['reward_sums'] += shard.reward_sums
+        return totals
+
+    @staticmethod
+    def _compose(totals: Dict, epsilon: float) -> Dict:
+        return {
+            'selection_counts': totals['selections'],
+            'exploration_count': int(totals['explorations']),
+            'arm_counts': totals['reward_counts'],
+            'arm_rewards': totals['reward_sums'],
+            'epsilon': epsilon,
+            'merged_at': time.time()
+        }
+
+    def merge(self) -> Dict:
+        """Fold every shard into a new published snapshot"""
+        with self._merge_lock:
+            totals = self._totals()
+            # Decay epsilon over time (less exploration as we learn)
+            observed = totals['reward_counts'].sum() - self._epsilon_anchor
+            epsilon = max(self.min_epsilon, self._base_epsilon * self.epsilon_decay ** observed)
+            self.snapshot = self._compose(totals, epsilon)
+            return self.snapshot
+
+    def restore(self, selection_counts, exploration_count: int, arm_counts, arm_rewards, epsilon: float):
+        """Make the merged totals equal a checkpoint, keeping shard history"""
+        with self._merge_lock:
+            self._base = {
+                'selections': np.zeros(self.num_arms),
+                'explorations': 0,
+                'reward_counts': np.zeros(self.num_arms),
+                'reward_sums': np.zeros(self.num_arms)
+            }
+            shard_totals = self._totals()
+            self._base = {
+                'selections': np.asarray(selection_counts, dtype=np.float64) - shard_totals['selections'],
+                'explorations': int(exploration_count) - shard_totals['explorations'],
+                'reward_counts': np.asarray(arm_counts, dtype=np.float64) - shard_totals['reward_counts'],
+                'reward_sums': np.asarray(arm_rewards, dtype=np.float64) - shard_totals['reward_sums']
+            }
+            self._base_epsilon = float(epsilon)
+            self._epsilon_anchor = float(np.sum(arm_counts))
+        self.merge()
+
+    @property
+    def epsilon(self) -> float:
+        return self.snapshot['epsilon']
+
+    @property
+    def total_updates(self) -> float:
+        """Selections + rewards in the current snapshot (changes whenever stats do)"""
+        return float(self.snapshot['selection_counts'].sum() + self.snapshot['arm_counts'].sum())
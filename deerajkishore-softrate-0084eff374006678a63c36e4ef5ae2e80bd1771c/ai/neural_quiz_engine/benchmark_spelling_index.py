@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: SpellingIndex vs per-token difflib.get_close_matches
+Simulates many students answering the same questions with typos
+Usage: python benchmark_spelling_index.py [num_students]
+"""
+import difflib
+import random
+import sys
+import time
+
+from answer_features import meaningful_tokens, normalize_text
+from spelling_index import SpellingIndex
+
+REFERENCE_ANSWERS = [
+    "A primary key uniquely identifies each record in a database table",
+    "Normalization organizes tables to reduce redundancy and improve data integrity",
+    "A process is a program in execution while a thread is a lightweight unit of execution within a process",
+    "TCP is connection oriented and guarantees delivery while UDP is connectionless and faster",
+    "Polymorphism allows objects of different classes to be treated through a common interface",
+    "A deadlock occurs when processes wait indefinitely for resources held by each other",
+]
+
+
+def make_typo(token: str, rng: random.Random) -> str:
+    """Drop, swap or replace one character"""
+    if len(token) < 3:
+        return token
+    i = rng.randrange(len(token) - 1)
+    op = rng.choice(['drop', 'swap', 'replace'])
+    if op == 'drop':
+        return token[:i] + token[i + 1:]
+    if op == 'swap':
+        return token[:i] + token[i + 1] + token[i] + token[i + 2:]
+    return token[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + token[i + 1:]
+
+
+def student_tokens(reference_tokens, rng: random.Random):
+    tokens = set()
+    for token in reference_tokens:
+        roll = rng.random()
+        if roll < 0.3:
+            tokens.add(make_typo(token, rng))
+        elif roll < 0.8:
+            tokens.add(token)
+    tokens.update(rng.sample(['memory', 'fast', 'value', 'system', 'store', 'data'], 2))
+    return tokens
+
+
+def difflib_correct(tokens, vocabulary):
+    corrected = set()
+    for token in tokens:
+        if token in vocabulary:
+            corrected.add(token)
+        else:
+            matches = difflib.get_close_matches(token, vocabulary, n=1, cutoff=0.8)
+            corrected.add(matches[0] if matches else token)
+    return corrected
+
+
+def main():
+    num_students = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(42)
+
+    vocabularies = [meaningful_tokens(normalize_text(ref)) for ref in REFERENCE_ANSWERS]
+    workload = [
+        (q, student_tokens(vocabularies[q], rng))
+        for _ in range(num_students)
+        for q in range(len(vocabularies))
+    ]
+    print(f"📊 {len(workload)} answers, {sum(len(t) for _, t in workload)} tokens")
+
+    # Baseline: current difflib behaviour
+    start = time.perf_counter()
+    expected = [difflib_correct(tokens, vocabularies[q]) for q, tokens in workload]
+    difflib_s = time.perf_counter() - start
+
+    # Index: built once per question, shared by all students
+    start = time.perf_counter()
+    indexes = [SpellingIndex(vocab, cutoff=0.8) for vocab in vocabularies]
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [indexes[q].correct_tokens(tokens) for q, tokens in workload]
+    index_s = time.perf_counter() - start
+
+    mismatches = sum(1 for e, a in zip(expected, actual) if e != a)
+
+    print(f"   difflib.get_close_matches: {difflib_s * 1000:8.1f} ms")
+    print(f"   SpellingIndex (build):     {build_s * 1000:8.1f} ms")
+    print(f"   SpellingIndex (lookup):    {index_s * 1000:8.1f} ms")
+    print(f"   Speedup: {difflib_s / index_s:.1f}x")
+    print(f"   {'✅ Identical corrections' if mismatches == 0 else f'❌ {mismatches} mismatches'}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Build the TextVectorization vocabularies from the question bank
+Streams the questions collection and the questions embedded in quizzes,
+then writes frequency-ranked token lists for the Topic Extractor and the
+Answer Understanding Brain.
+Usage: python build_vocabulary.py
+"""
+from collections import Counter
+from typing import Dict, Iterator
+
+from config import DynamicConfig
+from database.mongodb_client import mongodb_client
+from topic_registry import TOPIC_ALIASES, TOPIC_NAMES
+from vocabulary import build_vocabulary, count_tokens, save_vocabulary
+
+QUESTION_FIELDS = {
+    'question_text': 1, 'text': 1, 'correct_answer': 1, 'correctAnswer': 1,
+    'options': 1, 'topic': 1
+}
+BATCH_SIZE = 500
+
+
+def iter_questions(db) -> Iterator[Dict]:
+    """Stream question documents from both storage layouts"""
+    cursor = db[mongodb_client.QUESTIONS_COLLECTION].find({}, QUESTION_FIELDS).batch_size(BATCH_SIZE)
+    for question in cursor:
+        yield question
+
+    cursor = db[mongodb_client.QUIZZES_COLLECTION].find(
+        {'questions.0': {'$exists': True}}, {'title': 1, 'questions': 1}).batch_size(BATCH_SIZE)
+    for quiz in cursor:
+        for question in quiz.get('questions', []):
+            # Referenced (ObjectId) questions are already covered above
+            if isinstance(question, dict):
+                yield question
+
+
+def main():
+    db = mongodb_client.db
+    topic_counter = count_tokens(list(TOPIC_NAMES) + list(TOPIC_ALIASES))
+    answer_counter = Counter()
+
+    print("📥 Streaming question bank from MongoDB...")
+    total = 0
+    for question in iter_questions(db):
+        question_text = question.get('question_text') or question.get('text') or ''
+        correct_answer = question.get('correct_answer', question.get('correctAnswer'))
+        options = [str(o) for o in question.get('options') or [] if isinstance(o, (str, int, float))]
+
+        # Topics are extracted from question text; answers are compared to references
+        count_tokens([question_text, question.get('topic') or ''], topic_counter)
+        count_tokens([question_text, str(correct_answer) if correct_answer is not None else ''] + options,
+                     answer_counter)
+
+        total += 1
+        if total % 5000 == 0:
+            print(f"   ... {total} questions")
+
+    for quiz in db[mongodb_client.QUIZZES_COLLECTION].find({}, {'title': 1}):
+        count_tokens([quiz.get('title') or ''], topic_counter)
+
+    topic_vocab = build_vocabulary(topic_counter, DynamicConfig.VOCAB_SIZE)
+    answer_vocab = build_vocabulary(answer_counter, DynamicConfig.ANSWER_VOCAB_SIZE)
+
+    save_vocabulary(topic_vocab, DynamicConfig.TOPIC_VOCAB_PATH)
+    save_vocabulary(answer_vocab, DynamicConfig.ANSWER_VOCAB_PATH)
+
+    print(f"✅ {total} questions processed")
+    print(f"   Topic vocabulary:  {len(topic_vocab)} of {len(topic_counter)} tokens -> {DynamicConfig.TOPIC_VOCAB_PATH}")
+    print(f"   Answer vocabulary: {len(answer_vocab)} of {len(answer_counter)} tokens -> {DynamicConfig.ANSWER_VOCAB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
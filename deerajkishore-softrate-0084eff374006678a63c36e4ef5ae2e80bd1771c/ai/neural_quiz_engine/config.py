@@ -8,10 +8,16 @@ from dotenv import load_dotenv
 import json
 
 # Force load .env from the same directory as this file
-env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+env_path = os.path.join(BASE_DIR, '.env')
 print(f"Loading .env from: {env_path}")
 load_dotenv(env_path)
 
+
+def _path_setting(name: str, default: str) -> str:
+    """Path from the environment, relative paths resolved against this directory (not the CWD)"""
+    return os.path.join(BASE_DIR, os.getenv(name, default))
+
 class DynamicConfig:
     """Dynamic configuration without MAX_QUESTIONS limit"""
 
@@ -47,9 +53,47 @@ class DynamicConfig:
     NUM_ARMS = int(os.getenv('NUM_ARMS', '3'))
     NUM_ROLES = int(os.getenv('NUM_ROLES', '8'))
 
+    # Bandit engine: 'neural' (network arms, epsilon-greedy) or 'linucb'
+    # (learns only from instructor regrades, POST /regrade_answer)
+    BANDIT_ENGINE = os.getenv('BANDIT_ENGINE', 'neural').lower()
+    LINUCB_ALPHA = float(os.getenv('LINUCB_ALPHA', '1.0'))
+
+    # Bandit arm statistics checkpoints
+    BANDIT_STATE_COLLECTION = os.getenv('BANDIT_STATE_COLLECTION', 'bandit_state')
+    BANDIT_CHECKPOINT_INTERVAL = float(os.getenv('BANDIT_CHECKPOINT_INTERVAL', '60'))
+    # Seconds between merges of the per-thread bandit stat shards
+    BANDIT_MERGE_INTERVAL = float(os.getenv('BANDIT_MERGE_INTERVAL', '1.0'))
+
+    # User knowledge store: in-process LRU tier + MongoDB write-behind
+    KNOWLEDGE_COLLECTION = os.getenv('KNOWLEDGE_COLLECTION', 'user_knowledge')
+    KNOWLEDGE_CACHE_USERS = int(os.getenv('KNOWLEDGE_CACHE_USERS', '10000'))
+    KNOWLEDGE_CACHE_TTL = float(os.getenv('KNOWLEDGE_CACHE_TTL', '60'))
+    KNOWLEDGE_FLUSH_INTERVAL = float(os.getenv('KNOWLEDGE_FLUSH_INTERVAL', '5'))
+    # Seconds of observations batched into each topic-network training step
+    KNOWLEDGE_TRAIN_INTERVAL = float(os.getenv('KNOWLEDGE_TRAIN_INTERVAL', '2'))
+    # Memory-mapped population snapshot (written by snapshot_knowledge.py)
+    KNOWLEDGE_SNAPSHOT_PATH = _path_setting('KNOWLEDGE_SNAPSHOT_PATH', 'models/knowledge_snapshot')
+
+    # Corpus vocabularies (written by build_vocabulary.py)
+    TOPIC_VOCAB_PATH = _path_setting('TOPIC_VOCAB_PATH', 'models/topic_vocab.txt')
+    ANSWER_VOCAB_PATH = _path_setting('ANSWER_VOCAB_PATH', 'models/answer_vocab.txt')
+
+    # Answer encoder weights (written by train_answer_encoder.py)
+    ANSWER_WEIGHTS_PATH = _path_setting('ANSWER_WEIGHTS_PATH', 'models/answer_brain.weights.h5')
+
     # Performance
     ENABLE_CACHING = os.getenv('ENABLE_CACHING', 'true').lower() == 'true'
     CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '2048'))
+    VERDICT_CACHE_SIZE = int(os.getenv('VERDICT_CACHE_SIZE', '4096'))
+    COMPILED_ENCODER = os.getenv('COMPILED_ENCODER', 'true').lower() == 'true'
+    BENCHMARK_ENCODER = os.getenv('BENCHMARK_ENCODER', 'false').lower() == 'true'
+    # Skip the answer encoder only when lexical stages fix the score exactly (0);
+    # a positive width allows approximate early scores
+    CASCADE_TOLERANCE = float(os.getenv('CASCADE_TOLERANCE', '0.0'))
+
+    # TensorFlow-free answer encoder (written by export_answer_encoder.py)
+    NUMPY_ENCODER_PATH = _path_setting('NUMPY_ENCODER_PATH', 'models/answer_encoder.npz')
 
     # Question Loading Strategy
     QUESTION_LOAD_STRATEGY = os.getenv(
@@ -59,6 +103,10 @@ class DynamicConfig:
     SAMPLE_SIZE_PERCENTAGE = float(
         os.getenv('SAMPLE_SIZE_PERCENTAGE', '100.0'))  # 100% = ALL
 
+    # Derived question fields (precompute_questions.py)
+    DEFAULT_DIFFICULTY = float(os.getenv('DEFAULT_DIFFICULTY', '0.5'))
+    PRECOMPUTE_EMBEDDINGS = os.getenv('PRECOMPUTE_EMBEDDINGS', 'true').lower() == 'true'
+
     @classmethod
     def get_question_limit(cls, total_available: int) -> int:
         """
@@ -104,11 +152,17 @@ class DynamicConfig:
                 'vocab_size': cls.VOCAB_SIZE,
                 'num_topics': cls.NUM_TOPICS,
                 'num_arms': cls.NUM_ARMS,
+                'bandit_engine': cls.BANDIT_ENGINE,
                 'num_roles': cls.NUM_ROLES
             },
             'performance': {
                 'caching_enabled': cls.ENABLE_CACHING,
-                'cache_ttl_seconds': cls.CACHE_TTL
+                'cache_ttl_seconds': cls.CACHE_TTL,
+                'embedding_cache_size': cls.EMBEDDING_CACHE_SIZE,
+                'verdict_cache_size': cls.VERDICT_CACHE_SIZE,
+                'compiled_encoder': cls.COMPILED_ENCODER,
+                'cascade_tolerance': cls.CASCADE_TOLERANCE,
+                'knowledge_cache_users': cls.KNOWLEDGE_CACHE_USERS
             }
         }
 
@@ -150,6 +204,7 @@ class DynamicConfig:
         print(f"\n🧠 NEURAL BRAINS:")
         print(f"   Topics: {summary['neural_brains']['num_topics']}")
         print(f"   Bandit Arms: {summary['neural_brains']['num_arms']}")
+        print(f"   Bandit Engine: {summary['neural_brains']['bandit_engine']}")
         print(f"   Roles: {summary['neural_brains']['num_roles']}")
 
         print(f"\n⚡ PERFORMANCE:")
@@ -158,5 +213,15 @@ class DynamicConfig:
         if summary['performance']['caching_enabled']:
             print(
                 f"   Cache TTL: {summary['performance']['cache_ttl_seconds']}s")
+            print(
+                f"   Embedding Cache Size: {summary['performance']['embedding_cache_size']}")
+            print(
+                f"   Verdict Cache Size: {summary['performance']['verdict_cache_size']}")
+        print(
+            f"   Answer Encoder: {'Compiled' if summary['performance']['compiled_encoder'] else 'Eager'}")
+        print(
+            f"   Scoring Cascade Tolerance: {summary['performance']['cascade_tolerance']}")
+        print(
+            f"   Knowledge Cache Users: {summary['performance']['knowledge_cache_users']}")
 
         print("\n" + "=" * 60)
@@ -0,0 +1,47 @@
+"""
+Export the Answer Understanding Brain for TensorFlow-free serving
+Writes vocabulary + encoder weights to .npz and verifies the NumPy backend
+Usage: python export_answer_encoder.py [output_path]
+"""
+import os
+import sys
+
+from config import DynamicConfig
+from answer_brain import AnswerUnderstandingBrain
+from numpy_encoder import export_encoder_weights, NumpyAnswerEncoder, verify_encoder
+
+SAMPLE_TEXTS = [
+    "a primary key uniquely identifies each record in a table",
+    "normalization removes redundancy from database tables",
+    "a process is a program in execution, a thread is a lightweight process",
+    "tcp is connection oriented while udp is connectionless",
+    "",
+]
+
+
+def main():
+    output_path = sys.argv[1] if len(sys.argv) > 1 else DynamicConfig.NUMPY_ENCODER_PATH
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    print("🧠 Building Answer Understanding Brain...")
+    brain = AnswerUnderstandingBrain(vocab_size=DynamicConfig.ANSWER_VOCAB_SIZE,
+                                     vocabulary_path=DynamicConfig.ANSWER_VOCAB_PATH)
+    if os.path.exists(DynamicConfig.ANSWER_WEIGHTS_PATH):
+        brain.load_trained_weights(DynamicConfig.ANSWER_WEIGHTS_PATH)
+
+    print(f"📦 Exporting encoder weights to {output_path}")
+    export_encoder_weights(brain, output_path)
+
+    result = verify_encoder(brain, NumpyAnswerEncoder(output_path), SAMPLE_TEXTS)
+    status = "✅ PASSED" if result['passed'] else "❌ FAILED"
+    print(f"{status}: max abs diff {result['max_abs_diff']:.2e} "
+          f"(tolerance {result['tolerance']:.0e}, {result['samples']} samples)")
+
+    if not result['passed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
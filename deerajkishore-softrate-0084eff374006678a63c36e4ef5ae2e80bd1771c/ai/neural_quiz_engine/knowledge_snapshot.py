@@ -0,0 +1,141 @@
+"""
+Knowledge Snapshot - Columnar, memory-mappable dump of all users' knowledge
+A snapshot directory holds one .npy file per column plus meta.json:
+  user_ids.npy     (U,)           user id of every row
+  order.npy        (U,)           argsort of user_ids, for binary-search lookup
+  values.npy       (U, T, 20)     float32 ring buffers
+  heads.npy        (U, T)         int8 next-write slots
+  stats.npy        (U, T, 4)      float64 running [n, S, W, Q] sums
+A restarted worker maps the files and serves users without unpickling.
+"""
+import json
+import os
+import shutil
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from knowledge_store import HISTORY_LENGTH, PerformanceHistory
+
+SNAPSHOT_VERSION = 1
+
+
+def write_snapshot(path: str, topics: List[str],
+                   users: Iterable[Tuple[str, PerformanceHistory]], count: int,
+                   created_at: Optional[float] = None) -> int:
+    """
+    Stream (user_id, history) pairs into a new snapshot at `path`.
+    `count` is an upper bound on the users; files are written next to the
+    target and swapped in at the end, so readers never see a partial one.
+    `created_at` (epoch seconds, default now) should be taken before the
+    users are read: writes after it are newer than the snapshot.
+    """
+    staging = path.rstrip('/') + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    num_topics = len(topics)
+    open_column = lambda name, shape, dtype: np.lib.format.open_memmap(
+        os.path.join(staging, name), mode='w+', dtype=dtype, shape=shape)
+    values = open_column('values.npy', (count, num_topics, HISTORY_LENGTH), np.float32)
+    heads = open_column('heads.npy', (count, num_topics), np.int8)
+    stats = open_column('stats.npy', (count, num_topics, 4), np.float64)
+
+    user_ids = []
+    for user_id, history in users:
+        if len(user_ids) == count:
+            break
+        row = len(user_ids)
+        rows = min(num_topics, len(history.values))
+        values[row, :rows] = history.values[:rows]
+        heads[row, :rows] = history.heads[:rows]
+        stats[row, :rows] = history.stats[:rows]
+        user_ids.append(str(user_id))
+    written = len(user_ids)
+    del values, heads, stats
+
+    if written < count:
+        # Fewer users than expected (deleted meanwhile): trim the columns
+        for name in ('values.npy', 'heads.npy', 'stats.npy'):
+            column = np.load(os.path.join(staging, name), mmap_mode='r')[:written]
+            np.save(os.path.join(staging, name + '.trim'), column)
+            del column
+            os.replace(os.path.join(staging, name + '.trim.npy'), os.path.join(staging, name))
+
+    user_ids = np.array(user_ids, dtype=str)
+    np.save(os.path.join(staging, 'user_ids.npy'), user_ids)
+    np.save(os.path.join(staging, 'order.npy'), np.argsort(user_ids, kind='stable'))
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump({
+            'version': SNAPSHOT_VERSION,
+            'topics': topics,
+            'history_length': HISTORY_LENGTH,
+            'users': written,
+            'created_at': created_at if created_at is not None else time.time()
+        }, f)
+
+    # Swap the finished snapshot in place of the old one
+    previous = path.rstrip('/') + '.old'
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return written
+
+
+class PopulationSnapshot:
+    """Read-only, memory-mapped view of a snapshot directory"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != SNAPSHOT_VERSION or meta.get('history_length') != HISTORY_LENGTH:
+            raise ValueError(f"Unsupported knowledge snapshot at {path}")
+
+        self.path = path
+        self.topics = meta['topics']
+        self.created_at = meta['created_at']
+        self.user_ids = np.load(os.path.join(path, 'user_ids.npy'), mmap_mode='r')
+        self.order = np.load(os.path.join(path, 'order.npy'), mmap_mode='r')
+        self.values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+        self.heads = np.load(os.path.join(path, 'heads.npy'), mmap_mode='r')
+        self.stats = np.load(os.path.join(path, 'stats.npy'), mmap_mode='r')
+
+    @classmethod
+    def open(cls, path: str) -> Optional['PopulationSnapshot']:
+        """Load a snapshot if one exists at `path`"""
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def lookup(self, user_id: str) -> Optional[int]:
+        """Row of a user (binary search over the sorted ids), None if absent"""
+        position = self._search(user_id)
+        if position < len(self.order) and self.user_ids[self.order[position]] == user_id:
+            return int(self.order[position])
+        return None
+
+    def _search(self, user_id: str) -> int:
+        """Leftmost sorted position of user_id, touching only O(log U) mapped rows"""
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.user_ids[self.order[mid]] < user_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def history(self, row: int, topic_rows: np.ndarray, num_rows: int) -> PerformanceHistory:
+        """Mutable copy of a user's buffers, snapshot topic i placed at topic_rows[i] (skipped if < 0)"""
+        history = PerformanceHistory(num_rows)
+        kept = topic_rows >= 0
+        history.values[topic_rows[kept]] = self.values[row][kept]
+        history.heads[topic_rows[kept]] = self.heads[row][kept]
+        history.stats[topic_rows[kept]] = self.stats[row][kept]
+        return history
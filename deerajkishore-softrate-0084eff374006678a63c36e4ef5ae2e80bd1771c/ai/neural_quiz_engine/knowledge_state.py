@@ -2,149 +2,268 @@
 Knowledge State Brain - Online Regression Network
 Tracks user knowledge state across topics
 """
+import queue
+import threading
+import time
 import tensorflow as tf
 import numpy as np
 from typing import Dict, Tuple, List, Optional
 import pickle
 import os
 
+from knowledge_store import COUNT, SUM, SUM_SQUARES, WEIGHTED_SUM, KnowledgeStore
+from topic_registry import TOPIC_NAMES
+
+# Observations drained per training round
+MAX_TRAINING_BATCH = 4096
+
+
+def _glorot_uniform(fan_in: int, fan_out: int) -> tf.keras.initializers.Initializer:
+    """Glorot init of one topic's slice, as its own Dense layer would get"""
+    limit = float(np.sqrt(6.0 / (fan_in + fan_out)))
+    return tf.keras.initializers.RandomUniform(-limit, limit)
+
+
+class StackedTopicNetworks(tf.keras.layers.Layer):
+    """
+    All per-topic mastery networks (Dense 16 -> BatchNorm -> Dense 8 -> Dense 1)
+    as weight tensors with a leading topic axis. Each row of a batch is run
+    through its own topic's weights with batched einsums; BatchNorm uses
+    per-topic batch statistics (segment moments) and per-topic moving stats.
+    """
+
+    def __init__(self, num_topics: int, input_dim: int = 4, units=(16, 8),
+                 momentum: float = 0.99, epsilon: float = 1e-3, **kwargs):
+        super().__init__(**kwargs)
+        self.num_topics = num_topics
+        self.momentum = momentum
+        self.epsilon = epsilon
+        hidden, second = units
+        t = num_topics
+
+        self.kernel1 = self.add_weight(name='kernel1', shape=(t, input_dim, hidden),
+                                       initializer=_glorot_uniform(input_dim, hidden))
+        self.bias1 = self.add_weight(name='bias1', shape=(t, hidden), initializer='zeros')
+        self.gamma = self.add_weight(name='gamma', shape=(t, hidden), initializer='ones')
+        self.beta = self.add_weight(name='beta', shape=(t, hidden), initializer='zeros')
+        self.moving_mean = self.add_weight(name='moving_mean', shape=(t, hidden),
+                                           initializer='zeros', trainable=False)
+        self.moving_variance = self.add_weight(name='moving_variance', shape=(t, hidden),
+                                               initializer='ones', trainable=False)
+        self.kernel2 = self.add_weight(name='kernel2', shape=(t, hidden, second),
+                                       initializer=_glorot_uniform(hidden, second))
+        self.bias2 = self.add_weight(name='bias2', shape=(t, second), initializer='zeros')
+        self.kernel3 = self.add_weight(name='kernel3', shape=(t, second, 1),
+                                       initializer=_glorot_uniform(second, 1))
+        self.bias3 = self.add_weight(name='bias3', shape=(t, 1), initializer='zeros')
+
+    def call(self, topic_ids, features, training=False):
+        """(batch,) topic ids + (batch, input_dim) features -> (batch, 1) mastery"""
+        topic_ids = tf.cast(topic_ids, tf.int32)
+        x = tf.einsum('bi,bio->bo', features, tf.gather(self.kernel1, topic_ids))
+        x = tf.nn.relu(x + tf.gather(self.bias1, topic_ids))
+
+        if training:
+            # Batch moments of each topic's own rows
+            mean = tf.math.unsorted_segment_mean(x, topic_ids, self.num_topics)
+            variance = tf.math.unsorted_segment_mean(
+                tf.square(x - tf.gather(mean, topic_ids)), topic_ids, self.num_topics)
+
+            # Moving stats move only for topics present in the batch
+            present = tf.math.unsorted_segment_sum(tf.ones_like(topic_ids, dtype=x.dtype),
+                                                   topic_ids, self.num_topics)[:, None] > 0
+            decay = 1.0 - self.momentum
+            self.moving_mean.assign(tf.where(
+                present, self.moving_mean - (self.moving_mean - mean) * decay, self.moving_mean))
+            self.moving_variance.assign(tf.where(
+                present, self.moving_variance - (self.moving_variance - variance) * decay, self.moving_variance))
+        else:
+            mean, variance = self.moving_mean, self.moving_variance
+
+        x = tf.nn.batch_normalization(
+            x, tf.gather(mean, topic_ids), tf.gather(variance, topic_ids),
+            tf.gather(self.beta, topic_ids), tf.gather(self.gamma, topic_ids), self.epsilon)
+
+        x = tf.einsum('bi,bio->bo', x, tf.gather(self.kernel2, topic_ids))
+        x = tf.nn.relu(x + tf.gather(self.bias2, topic_ids))
+        x = tf.einsum('bi,bio->bo', x, tf.gather(self.kernel3, topic_ids))
+        return tf.sigmoid(x + tf.gather(self.bias3, topic_ids))
+
 
 class KnowledgeStateBrain(tf.keras.Model):
     """Online Regression Network for user knowledge tracking"""
 
-    def __init__(self, num_topics: int = 20):
+    def __init__(self, num_topics: int = 20, store: Optional[KnowledgeStore] = None,
+                 train_interval: float = 2.0):
         super().__init__()
 
         self.num_topics = num_topics
 
-        # Topic mapping
-        self.topic_names = [
-            'DBMS', 'Python', 'JavaScript', 'Java', 'C++',
-            'Data Structures', 'Algorithms', 'Networking', 'OS',
-            'System Design', 'OOPS', 'React', 'Node.js', 'AWS',
-            'DevOps', 'Machine Learning', 'SQL', 'MongoDB',
-            'Git', 'Docker'
-        ]
-
-        # Topic mastery networks (one per topic)
-        self.topic_networks = []
-        for _ in range(num_topics):
-            network = tf.keras.Sequential([
-                tf.keras.layers.Dense(16, activation='relu', input_shape=(4,)),
-                tf.keras.layers.BatchNormalization(),
-                tf.keras.layers.Dense(8, activation='relu'),
-                tf.keras.layers.Dense(1, activation='sigmoid')
-            ])
-            self.topic_networks.append(network)
-
-        # Optimizers (one per topic network)
-        self.optimizers = [tf.keras.optimizers.Adam(learning_rate=0.001) 
-                          for _ in range(num_topics)]
-
-        # Confidence estimator
-        self.confidence_net = tf.keras.Sequential([
-            tf.keras.layers.Dense(16, activation='relu', input_shape=(3,)),
-            tf.keras.layers.Dense(8, activation='relu'),
-            tf.keras.layers.Dense(1, activation='sigmoid')
-        ])
-
-        # User knowledge memory (topic -> [scores])
-        self.user_knowledge_db = {}
-
-
-
-    def _get_topic_index(self, topic: str) -> int:
-        """Map topic name to index"""
-        topic_mapping = {name: idx for idx,
-                         name in enumerate(self.topic_names)}
-        return topic_mapping.get(topic, 0)
+        # Topic mapping (registry ids 0..num_topics-1)
+        self.topic_names = list(TOPIC_NAMES[:num_topics])
+
+        # Topic mastery networks (one per topic), stacked along a topic axis
+        self.topic_networks = StackedTopicNetworks(num_topics)
+
+        # One optimizer over the stacked weights
+        self.topic_optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
+
+        # User knowledge memory (user -> topic ring buffers), bounded + persisted
+        self.store = store if store is not None else KnowledgeStore()
+        self.registry = self.store.registry
+        self._topic_rows = self.registry.ids(self.topic_names)
+
+        # Online training runs off the request path: observations are queued
+        # and a background trainer applies one batched step per topic network
+        self.train_interval = train_interval
+        self._observations = queue.Queue()
+        self._train_step = tf.function(
+            self._topic_train_step,
+            input_signature=[tf.TensorSpec(shape=[None], dtype=tf.int32),
+                             tf.TensorSpec(shape=[None, 4], dtype=tf.float32),
+                             tf.TensorSpec(shape=[None, 1], dtype=tf.float32)]
+        )
+        self.training_stats = {'observations': 0, 'steps': 0, 'rounds': 0, 'last_loss': None}
+        self._trainer = threading.Thread(target=self._train_loop, name="knowledge-trainer", daemon=True)
+        self._trainer.start()
+
+    def _get_topic_index(self, topic: str) -> Optional[int]:
+        """Map topic name (or alias) to its network, None for topics without one"""
+        topic_id = self.registry.id(topic)
+        return topic_id if topic_id is not None and topic_id < self.num_topics else None
 
     def update_knowledge(self, user_id: str, topic: str, performance: float,
                          question_difficulty: float, time_taken: float,
                          time_efficiency: float = 0.5) -> Tuple[float, float]:
-        """Update user's knowledge state for a topic"""
-
-        # Initialize user data if not exists
-        if user_id not in self.user_knowledge_db:
-            self.user_knowledge_db[user_id] = {}
-
-        if topic not in self.user_knowledge_db[user_id]:
-            self.user_knowledge_db[user_id][topic] = []
-
-        # Get topic index
+        """
+        Update user's knowledge state for a topic.
+        Records the performance and queues the training observation;
+        returns the updated (mastery, confidence) from the ring buffer.
+        """
+        # Store the performance (ring buffer keeps only the last 20)
+        self.store.append(user_id, topic, performance)
+
+        # Features: [performance, difficulty, time_taken, time_efficiency]
+        features = (performance, question_difficulty, np.log1p(time_taken) / 10, time_efficiency)
         topic_idx = self._get_topic_index(topic)
+        if topic_idx is not None:
+            self._observations.put((topic_idx, features, performance))
 
-        # Create features: [performance, difficulty, time_taken, time_efficiency]
-        features = tf.constant([[performance, question_difficulty,
-                               np.log1p(time_taken) / 10, time_efficiency]],
-                               dtype=tf.float32)
-
-        # Get current mastery prediction
-        current_mastery = float(self.topic_networks[topic_idx](
-            features, training=False).numpy()[0][0])
+        return self.get_mastery(user_id, topic)
 
-        # Online training step
+    def _topic_train_step(self, topic_ids, features, targets):
+        """One gradient step over rows of any mix of topics"""
+        variables = self.topic_networks.trainable_variables
         with tf.GradientTape() as tape:
-            prediction = self.topic_networks[topic_idx](
-                features, training=True)
-            loss = tf.keras.losses.MSE(performance, prediction)
-
-        # Apply gradients
-        grads = tape.gradient(
-            loss, self.topic_networks[topic_idx].trainable_variables)
-        self.optimizers[topic_idx].apply_gradients(
-            zip(grads, self.topic_networks[topic_idx].trainable_variables)
+            prediction = self.topic_networks(topic_ids, features, training=True)
+            # Per-topic mean loss, summed: each topic gets the gradient its own network would
+            per_row = tf.keras.losses.MSE(targets, prediction)
+            loss = tf.reduce_sum(tf.math.unsorted_segment_mean(
+                per_row, topic_ids, self.topic_networks.num_topics))
+        # Gathers give IndexedSlices with repeated topics; Adam needs the summed dense gradient
+        grads = [tf.convert_to_tensor(grad) for grad in tape.gradient(loss, variables)]
+        self.topic_optimizer.apply_gradients(zip(grads, variables))
+        return loss
+
+    def _train_batch(self, observations: List[Tuple]):
+        """One batched gradient step over all queued observations, every topic at once"""
+        topic_ids, features, targets = zip(*observations)
+        loss = self._train_step(
+            tf.constant(topic_ids, dtype=tf.int32),
+            tf.constant(features, dtype=tf.float32),
+            tf.constant(targets, dtype=tf.float32)[:, None]
         )
-
-        # Store the performance
-        self.user_knowledge_db[user_id][topic].append(performance)
-
-        # Keep only last 20 performances
-        if len(self.user_knowledge_db[user_id][topic]) > 20:
-            self.user_knowledge_db[user_id][topic].pop(0)
-
-        # Calculate confidence based on consistency
-        confidence_features = tf.constant([[
-            performance,
-            len(self.user_knowledge_db[user_id][topic]),
-            np.std(self.user_knowledge_db[user_id][topic]) if len(
-                self.user_knowledge_db[user_id][topic]) > 1 else 0.5
-        ]], dtype=tf.float32)
-
-        confidence = float(self.confidence_net(
-            confidence_features, training=False).numpy()[0][0])
-
-        return float(prediction.numpy()[0][0]), confidence
+        self.training_stats['steps'] += 1
+        self.training_stats['last_loss'] = float(loss)
+        self.training_stats['observations'] += len(observations)
+        self.training_stats['rounds'] += 1
+
+    def _train_loop(self):
+        """Background trainer: every train_interval, drain the queue and train"""
+        while True:
+            observations = [self._observations.get()]
+            try:
+                # Let observations accumulate so each network sees one batch
+                time.sleep(self.train_interval)
+                while len(observations) < MAX_TRAINING_BATCH:
+                    observations.append(self._observations.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                self._train_batch(observations)
+            except Exception as e:
+                print(f"⚠️  Knowledge training failed: {e}")
+            finally:
+                for _ in observations:
+                    self._observations.task_done()
+
+    def flush_training(self):
+        """Block until every queued observation has been trained on"""
+        self._observations.join()
+
+    def close(self):
+        """Finish pending training and persist user knowledge"""
+        self.flush_training()
+        self.store.close()
 
     def get_mastery(self, user_id: str, topic: str) -> Tuple[float, float]:
         """Get mastery and confidence for a topic"""
-        if user_id in self.user_knowledge_db and topic in self.user_knowledge_db[user_id]:
-            performances = self.user_knowledge_db[user_id][topic]
-            if performances:
-                # Calculate mastery as weighted average (recent performances weighted more)
-                weights = np.arange(1, len(performances) + 1)  # Linear weights
-                weights = weights / weights.sum()
-                mastery = np.average(performances, weights=weights)
+        row = self.store.topic_row(topic, create=False)
+        summary = self.store.history(user_id).summary(row) if row is not None else None
+        if summary is not None:
+            # Mastery: linearly recency-weighted average, from running sums
+            mastery, std_dev, count = summary
 
-                # Calculate confidence (inverse of standard deviation)
-                std_dev = np.std(performances) if len(
-                    performances) > 1 else 0.5
-                confidence = 1.0 / (1.0 + std_dev)  # Convert to 0-1 scale
+            # Calculate confidence (inverse of standard deviation)
+            if count <= 1:
+                std_dev = 0.5
+            confidence = 1.0 / (1.0 + std_dev)  # Convert to 0-1 scale
 
-                return float(mastery), float(confidence)
+            return float(mastery), float(confidence)
 
         return 0.1, 0.1  # Default values (low mastery for unknown topics)
 
+    def _profile_stats(self, user_ids: List[str], topics: List[str]) -> np.ndarray:
+        """Running sums of every (user, topic), (users, topics, 4)"""
+        rows = self.store.topic_rows_for(topics)
+        return np.stack([self.store.history(user_id).gather(rows) for user_id in user_ids]) \
+            if len(user_ids) else np.zeros((0, len(topics), 4))
+
+    @staticmethod
+    def _mastery_from_stats(stats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized get_mastery over any (..., 4) block of running sums"""
+        n = stats[..., COUNT]
+        safe_n = np.maximum(n, 1)
+        mastery = stats[..., WEIGHTED_SUM] / (safe_n * (safe_n + 1) / 2)
+        variance = np.maximum(stats[..., SUM_SQUARES] / safe_n - (stats[..., SUM] / safe_n) ** 2, 0.0)
+        std_dev = np.where(n > 1, np.sqrt(variance), 0.5)
+        confidence = 1.0 / (1.0 + std_dev)
+
+        # Default values (low mastery for unknown topics)
+        return np.where(n > 0, mastery, 0.1), np.where(n > 0, confidence, 0.1)
+
+    def get_mastery_matrix(self, user_ids: List[str],
+                           topics: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mastery and confidence of every user on every topic in one pass,
+        each (len(user_ids), len(topics)); topics default to topic_names
+        """
+        topics = self.topic_names if topics is None else list(topics)
+        return self._mastery_from_stats(self._profile_stats(user_ids, topics))
+
     def get_all_mastery(self, user_id: str) -> Dict[str, Dict]:
         """Get mastery for all topics for a user"""
+        stats = self._profile_stats([user_id], self.topic_names)[0]
+        mastery, confidence = self._mastery_from_stats(stats)
+
         results = {}
-        for topic in self.topic_names:
-            mastery, confidence = self.get_mastery(user_id, topic)
+        for i, topic in enumerate(self.topic_names):
             results[topic] = {
-                'mastery': mastery,
-                'confidence': confidence,
-                'level': self._get_mastery_level(mastery),
-                'attempts': len(self.user_knowledge_db.get(user_id, {}).get(topic, []))
+                'mastery': float(mastery[i]),
+                'confidence': float(confidence[i]),
+                'level': self._get_mastery_level(mastery[i]),
+                'attempts': int(stats[i, COUNT])
             }
 
         return results
@@ -162,46 +281,56 @@ class KnowledgeStateBrain(tf.keras.Model):
         else:
             return "Novice"
 
-    def get_weak_topics(self, user_id: str, threshold: float = 0.4) -> List[str]:
-        """Get topics where user is weak"""
-        weak_topics = []
-        for topic in self.topic_names:
-            mastery, _ = self.get_mastery(user_id, topic)
-            if mastery < threshold:
-                weak_topics.append(topic)
-        return weak_topics[:5]  # Return top 5 weak topics
-
-    def get_strong_topics(self, user_id: str, threshold: float = 0.7) -> List[str]:
-        """Get topics where user is strong"""
-        strong_topics = []
-        for topic in self.topic_names:
-            mastery, _ = self.get_mastery(user_id, topic)
-            if mastery >= threshold:
-                strong_topics.append(topic)
-        return strong_topics[:5]  # Return top 5 strong topics
+    @staticmethod
+    def top_k(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+        """Indices of the k largest (or smallest) entries of each row, best first, ties by index"""
+        values = np.atleast_2d(values)
+        keys = -values if largest else values
+        k = min(k, values.shape[1])
+        if k <= 0:
+            return np.zeros((len(values), 0), dtype=np.int64)
+        # Stable sort: equal masteries keep topic id order, so results are deterministic
+        return np.argsort(keys, axis=1, kind='stable')[:, :k]
+
+    def _ranked_topics(self, user_id: str, k: int, largest: bool, keep) -> List[str]:
+        """The k best attempted topics whose mastery passes `keep`"""
+        stats = self._profile_stats([user_id], self.topic_names)[0]
+        mastery, _ = self._mastery_from_stats(stats)
+        # Unattempted topics only carry the default mastery
+        eligible = np.flatnonzero((stats[:, COUNT] > 0) & keep(mastery))
+        return [self.topic_names[i] for i in eligible[self.top_k(mastery[eligible], k, largest)[0]]]
+
+    def get_weak_topics(self, user_id: str, threshold: float = 0.4, k: int = 5) -> List[str]:
+        """Get the k weakest attempted topics below threshold, weakest first"""
+        return self._ranked_topics(user_id, k, False, lambda mastery: mastery < threshold)
+
+    def get_strong_topics(self, user_id: str, threshold: float = 0.7, k: int = 5) -> List[str]:
+        """Get the k strongest topics at or above threshold, strongest first"""
+        return self._ranked_topics(user_id, k, True, lambda mastery: mastery >= threshold)
 
     def get_consistency_score(self, user_id: str) -> float:
         """Calculate user's consistency across topics"""
-        variances = []
-        for topic in self.topic_names:
-            if user_id in self.user_knowledge_db and topic in self.user_knowledge_db[user_id]:
-                performances = self.user_knowledge_db[user_id][topic]
-                if len(performances) >= 3:
-                    variance = np.var(performances)
-                    variances.append(variance)
-
-        if variances:
+        variances, counts = self.store.history(user_id).variances(self._topic_rows)
+        variances = variances[counts >= 3]
+
+        if variances.size:
             avg_variance = np.mean(variances)
             consistency = 1.0 / (1.0 + avg_variance)
             return float(consistency)
 
         return 0.5
 
+    def save_snapshot(self, path: str) -> int:
+        """Write every user's knowledge to a memory-mappable snapshot directory"""
+        return self.store.export_snapshot(path)
+
     def save_user_data(self, user_id: str, filepath: str):
         """Save user's knowledge data to file"""
-        if user_id in self.user_knowledge_db:
+        history = self.store.history(user_id)
+        if history.rows().size:
             data = {
-                'knowledge_data': self.user_knowledge_db[user_id],
+                'knowledge_data': {self.store.topic_names[row]: history.performances(row)
+                                   for row in history.rows()},
                 'saved_at': str(np.datetime64('now'))
             }
             with open(filepath, 'wb') as f:
@@ -212,6 +341,6 @@ class KnowledgeStateBrain(tf.keras.Model):
         if os.path.exists(filepath):
             with open(filepath, 'rb') as f:
                 data = pickle.load(f)
-                if user_id not in self.user_knowledge_db:
-                    self.user_knowledge_db[user_id] = {}
-                self.user_knowledge_db[user_id].update(data['knowledge_data'])
+                for topic, performances in data['knowledge_data'].items():
+                    for performance in performances:
+                        self.store.append(user_id, topic, performance)
@@ -0,0 +1,435 @@
+"""
+Knowledge Store - Bounded user knowledge tier with MongoDB write-behind
+Users are loaded lazily into an LRU-bounded in-process tier; new
+performances are appended to MongoDB in the background, so every worker
+converges on the same per-topic history.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from topic_registry import TOPICS, TopicRegistry
+
+# Performances kept per (user, topic)
+HISTORY_LENGTH = 20
+
+# Columns of PerformanceHistory.stats
+COUNT, SUM, WEIGHTED_SUM, SUM_SQUARES = range(4)
+
+
+def _field(topic: str) -> str:
+    """MongoDB field names cannot contain '.' or start with '$'"""
+    return topic.replace('.', '．').replace('$', '＄')
+
+
+def _topic(field: str) -> str:
+    return field.replace('．', '.').replace('＄', '$')
+
+
+def _epoch(moment) -> Optional[float]:
+    """Epoch seconds of a MongoDB date (naive datetimes are UTC), None if missing"""
+    if not isinstance(moment, datetime):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class PerformanceHistory:
+    """
+    One user's last HISTORY_LENGTH performances per topic row, as a
+    (topics, HISTORY_LENGTH) float32 ring buffer plus running sums
+    [n, S = sum x_i, W = sum i * x_i (oldest i = 1), Q = sum x_i^2]
+    so mastery (linearly recency-weighted mean) and spread are O(1).
+    """
+
+    def __init__(self, num_topics: int):
+        self.values = np.zeros((num_topics, HISTORY_LENGTH), dtype=np.float32)
+        self.heads = np.zeros(num_topics, dtype=np.int64)  # next slot to write
+        self.stats = np.zeros((num_topics, 4))
+
+    def _ensure_rows(self, rows: int):
+        missing = rows - len(self.values)
+        if missing > 0:
+            self.values = np.vstack([self.values, np.zeros((missing, HISTORY_LENGTH), dtype=np.float32)])
+            self.heads = np.concatenate([self.heads, np.zeros(missing, dtype=np.int64)])
+            self.stats = np.vstack([self.stats, np.zeros((missing, 4))])
+
+    def append(self, row: int, performance: float):
+        """Push a performance, dropping the oldest once the row is full (single writer)"""
+        self._ensure_rows(row + 1)
+        n, s, w, q = self.stats[row]
+        x = float(np.float32(performance))
+        head = self.heads[row]
+
+        if n < HISTORY_LENGTH:
+            n += 1
+            s, w, q = s + x, w + n * x, q + x * x
+        else:
+            # Every remaining weight drops by one, the oldest (weight 1) leaves
+            oldest = float(self.values[row, head])
+            w = w - s + HISTORY_LENGTH * x
+            s, q = s - oldest + x, q - oldest * oldest + x * x
+
+        self.values[row, head] = x
+        head = (head + 1) % HISTORY_LENGTH
+        self.heads[row] = head
+
+        if head == 0 and n == HISTORY_LENGTH:
+            # Resync once per lap so rounding in the running sums cannot drift
+            ordered = self.values[row].astype(np.float64)
+            s = ordered.sum()
+            w = float(np.arange(1, HISTORY_LENGTH + 1) @ ordered)
+            q = float(ordered @ ordered)
+
+        # One row assignment, so lock-free readers see consistent sums
+        self.stats[row] = (n, s, w, q)
+
+    def count(self, row: int) -> int:
+        return int(self.stats[row, COUNT]) if row < len(self.stats) else 0
+
+    def summary(self, row: int) -> Optional[Tuple[float, float, float]]:
+        """(mastery, std, n) of a row, None if it has no performances"""
+        if row >= len(self.stats):
+            return None
+        n, s, w, q = self.stats[row]
+        if n == 0:
+            return None
+        variance = max(q / n - (s / n) ** 2, 0.0)
+        return w / (n * (n + 1) / 2), float(np.sqrt(variance)), n
+
+    def gather(self, rows) -> np.ndarray:
+        """Running sums of the given rows, (len(rows), 4); unknown rows (< 0) are empty"""
+        rows = np.asarray(rows, dtype=np.int64)
+        stats = np.zeros((len(rows), 4))
+        present = (rows >= 0) & (rows < len(self.stats))
+        stats[present] = self.stats[rows[present]]
+        return stats
+
+    def variances(self, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """(population variances, counts) of the given rows"""
+        stats = self.gather(rows)
+        n = stats[:, COUNT]
+        safe_n = np.maximum(n, 1)
+        variance = np.maximum(stats[:, SUM_SQUARES] / safe_n - (stats[:, SUM] / safe_n) ** 2, 0.0)
+        return variance, n
+
+    def performances(self, row: int) -> List[float]:
+        """Chronological performances of a row"""
+        n = self.count(row)
+        if n == 0:
+            return []
+        if n < HISTORY_LENGTH:
+            return self.values[row, :n].tolist()
+        return np.roll(self.values[row], -self.heads[row]).tolist()
+
+    def rows(self) -> np.ndarray:
+        """Rows that hold at least one performance"""
+        return np.flatnonzero(self.stats[:, COUNT])
+
+
+class KnowledgeStore:
+    """
+    user_id -> PerformanceHistory with at most `max_users` users in
+    memory. Entries older than `ttl` are re-read from MongoDB so workers
+    pick up each other's writes; pending appends are never lost on eviction.
+    Topic rows are the registry's interned ids; unseen topics get new ids.
+    A PopulationSnapshot, if given, serves users MongoDB has not changed
+    since it was taken (and everyone when MongoDB is absent or failing).
+    """
+
+    def __init__(self, collection=None, max_users: int = 10000,
+                 flush_interval: float = 5.0, ttl: float = 60.0, snapshot=None,
+                 registry: Optional[TopicRegistry] = None):
+        self.collection = collection
+        self.snapshot = snapshot
+        self.registry = registry if registry is not None else TOPICS
+        self.max_users = max_users
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+
+        self._users = OrderedDict()  # user_id -> (loaded_at, PerformanceHistory)
+        self._pending = {}           # user_id -> {topic: [performances not yet written]}
+        self._inflight = set()       # users whose pending batch is being written
+        self._loading = {}           # user_id -> loads reading MongoDB (not flushed meanwhile)
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.snapshot_loads = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.written = 0
+        self.flush_errors = 0
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if collection is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="knowledge-flush", daemon=True)
+            self._flusher.start()
+
+    @property
+    def topic_names(self) -> List[str]:
+        """Topic of every row (registry id order)"""
+        return self.registry.names
+
+    def register_topics(self, topics: List[str]):
+        """Intern topics before users are loaded"""
+        for topic in topics:
+            self.registry.intern(topic)
+
+    def topic_rows_for(self, topics: List[str]) -> np.ndarray:
+        """Rows of several topics, -1 for unknown topics"""
+        return self.registry.ids(topics)
+
+    def topic_row(self, topic: str, create: bool = True) -> Optional[int]:
+        """Row of a topic (or alias) in every PerformanceHistory, None if it has none"""
+        return self.registry.intern(topic) if create else self.registry.id(topic)
+
+    def history(self, user_id: str) -> PerformanceHistory:
+        """Per-topic performance history of a user (loaded on first access)"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and (self.collection is None or time.monotonic() - entry[0] < self.ttl):
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            # MongoDB + pending must cover every write exactly once: wait out an
+            # in-flight write of this user, and keep flushes away until pending is read
+            while user_id in self._inflight:
+                self._flushed.wait()
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+
+        try:
+            history = self._load(user_id)  # outside the lock
+        finally:
+            with self._lock:
+                # Writes that have not reached MongoDB yet
+                pending = [(topic, list(performances))
+                           for topic, performances in self._pending.get(user_id, {}).items()]
+                self._loading[user_id] -= 1
+                if not self._loading[user_id]:
+                    del self._loading[user_id]
+        for topic, performances in pending:
+            row = self.topic_row(topic)
+            if row is None:
+                continue
+            for performance in performances:
+                history.append(row, performance)
+
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                # Another thread loaded it meanwhile
+                return entry[1]
+            self._users[user_id] = (time.monotonic(), history)
+            self._users.move_to_end(user_id)
+            self._evict()
+            return history
+
+    def append(self, user_id: str, topic: str, performance: float) -> Tuple[PerformanceHistory, int]:
+        """
+        Record a performance; returns the user's history and the topic row
+        (None for a topic the full registry could not intern: persisted only)
+        """
+        history = self.history(user_id)
+        row = self.topic_row(topic)
+        topic = self.registry.name(row) if row is not None else self.registry.canonical(topic)
+        with self._lock:
+            if row is not None:
+                history.append(row, performance)
+            if self.collection is not None:
+                self._pending.setdefault(user_id, {}).setdefault(topic, []).append(performance)
+        return history, row
+
+    def _build_history(self, topics: Dict[str, List[float]]) -> PerformanceHistory:
+        history = PerformanceHistory(len(self.topic_names))
+        for topic, performances in topics.items():
+            row = self.topic_row(topic)
+            if row is None:
+                continue  # registry full: persisted, not tracked in memory
+            for performance in performances:
+                history.append(row, performance)
+        return history
+
+    def _from_snapshot(self, user_id: str) -> Optional[PerformanceHistory]:
+        if self.snapshot is None:
+            return None
+        row = self.snapshot.lookup(user_id)
+        if row is None:
+            return None
+        rows = (self.topic_row(topic) for topic in self.snapshot.topics)
+        topic_rows = np.array([-1 if r is None else r for r in rows], dtype=np.int64)
+        self.snapshot_loads += 1
+        return self.snapshot.history(row, topic_rows, len(self.topic_names))
+
+    @staticmethod
+    def _parse(document: Optional[Dict]) -> Dict[str, List[float]]:
+        if not document:
+            return {}
+        return {_topic(field): [float(p) for p in performances][-HISTORY_LENGTH:]
+                for field, performances in (document.get('topics') or {}).items()}
+
+    def _load(self, user_id: str) -> PerformanceHistory:
+        """
+        MongoDB copy of a user. The snapshot row is used instead while the
+        document's updated_at is not newer than the snapshot, and whenever
+        MongoDB is absent or unreachable.
+        """
+        if self.collection is None:
+            return self._from_snapshot(user_id) or PerformanceHistory(len(self.topic_names))
+        try:
+            if self.snapshot is not None and self.snapshot.lookup(user_id) is not None:
+                # Cheap freshness probe before reading the topics
+                stamp = self.collection.find_one({'_id': user_id}, {'updated_at': 1})
+                updated_at = _epoch(stamp.get('updated_at')) if stamp is not None else None
+                if updated_at is not None and updated_at <= self.snapshot.created_at:
+                    return self._from_snapshot(user_id)
+            document = self.collection.find_one({'_id': user_id}, {'topics': 1})
+            self.loads += 1
+        except Exception as e:
+            print(f"⚠️  Could not load knowledge for {user_id}: {e}")
+            return self._from_snapshot(user_id) or PerformanceHistory(len(self.topic_names))
+        return self._build_history(self._parse(document))
+
+    def _server_time(self) -> float:
+        """MongoDB's clock, the one $currentDate stamps updated_at with (local clock if unavailable)"""
+        try:
+            server_time = _epoch(self.collection.database.command('hello').get('localTime'))
+        except Exception as e:
+            print(f"⚠️  Could not read the MongoDB clock: {e}")
+            server_time = None
+        return server_time if server_time is not None else time.time()
+
+    def export_snapshot(self, path: str) -> int:
+        """Write every user (MongoDB, else the in-process tier) to a snapshot directory"""
+        from knowledge_snapshot import write_snapshot
+
+        # Anything written after this is newer than the snapshot
+        created_at = self._server_time() if self.collection is not None else time.time()
+        if self.collection is not None:
+            self.flush()
+            # Every topic any user has, so the column layout is fixed before streaming
+            fields = self.collection.aggregate([
+                {'$project': {'topic': {'$objectToArray': '$topics'}}},
+                {'$unwind': '$topic'},
+                {'$group': {'_id': '$topic.k'}}
+            ])
+            self.register_topics(sorted(_topic(field['_id']) for field in fields))
+
+            count = self.collection.count_documents({})
+            cursor = self.collection.find({}, {'topics': 1}).batch_size(1000)
+            users = ((document['_id'], self._build_history(self._parse(document))) for document in cursor)
+        else:
+            with self._lock:
+                users = [(user_id, history) for user_id, (_, history) in self._users.items()]
+            count = len(users)
+
+        return write_snapshot(path, list(self.topic_names), users, count, created_at)
+
+    def _evict(self):
+        """Drop least recently used users over the cap (caller holds the lock)"""
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def flush(self) -> int:
+        """Append pending performances to MongoDB; returns users written"""
+        if self.collection is None:
+            return 0
+
+        with self._flush_lock:
+            with self._lock:
+                # Users being loaded keep their appends until the load has read them
+                pending = {user_id: topics for user_id, topics in self._pending.items()
+                           if user_id not in self._loading}
+                for user_id in pending:
+                    del self._pending[user_id]
+                self._inflight = set(pending)
+            if not pending:
+                return 0
+
+            users = list(pending)
+            operations = [
+                UpdateOne(
+                    {'_id': user_id},
+                    {
+                        '$push': {
+                            f'topics.{_field(topic)}': {'$each': performances, '$slice': -HISTORY_LENGTH}
+                            for topic, performances in pending[user_id].items()
+                        },
+                        '$currentDate': {'updated_at': True}
+                    },
+                    upsert=True
+                )
+                for user_id in users
+            ]
+            failed = []
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: only the reported operations failed, the rest are written
+                failed = sorted({users[error['index']] for error in e.details.get('writeErrors', [])})
+                print(f"⚠️  Knowledge write-behind failed for {len(failed)} of {len(users)} users")
+            except Exception as e:
+                failed = users
+                print(f"⚠️  Knowledge write-behind failed: {e}")
+            finally:
+                with self._lock:
+                    # Put failed users back in front of anything recorded meanwhile
+                    for user_id in failed:
+                        queued = self._pending.setdefault(user_id, {})
+                        for topic, performances in pending[user_id].items():
+                            queued[topic] = performances + queued.get(topic, [])
+                    self._inflight = set()
+                    self._flushed.notify_all()
+
+            if failed:
+                self.flush_errors += 1
+            if len(failed) == len(users):
+                return 0
+            self.flushes += 1
+            self.written += len(users) - len(failed)
+            return len(users) - len(failed)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background writer and flush what is left"""
+        self._stop.set()
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get_stats(self) -> Dict:
+        """Tier size, hit rate, eviction and write-behind counters"""
+        lookups = self.hits + self.misses
+        return {
+            'persistent': self.collection is not None,
+            'users': len(self._users),
+            'max_users': self.max_users,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'loads': self.loads,
+            'snapshot_users': len(self.snapshot) if self.snapshot is not None else 0,
+            'snapshot_loads': self.snapshot_loads,
+            'evictions': self.evictions,
+            'pending_users': len(self._pending),
+            'flushes': self.flushes,
+            'users_written': self.written,
+            'flush_errors': self.flush_errors
+        }
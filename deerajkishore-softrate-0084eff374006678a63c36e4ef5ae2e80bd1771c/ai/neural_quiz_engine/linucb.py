@@ -0,0 +1,87 @@
+"""
+LinUCB - Disjoint linear upper-confidence-bound contextual bandit
+Pure NumPy: per-arm A^-1 kept up to date with Sherman-Morrison, O(d^2) per update
+"""
+import threading
+
+import numpy as np
+from typing import Dict, Tuple
+
+
+class LinUCB:
+    """
+    One ridge-regression model per arm over the bandit context (+ bias term).
+    Selection reads an immutable (A_inv, theta) snapshot, updates build a new
+    one and swap it in, so scoring threads never see a half-applied update.
+    Tied bounds (every arm of a fresh or unrewarded model) are broken at
+    random, so untrained arms are explored instead of always picking arm 0.
+    """
+
+    def __init__(self, num_arms: int = 3, context_size: int = 6, alpha: float = 1.0):
+        self.num_arms = num_arms
+        self.context_size = context_size
+        self.alpha = alpha
+        self.dim = context_size + 1  # bias feature
+
+        a_inv = np.repeat(np.eye(self.dim)[None], num_arms, axis=0)  # A = I (ridge prior)
+        b = np.zeros((num_arms, self.dim))
+        self._snapshot = (a_inv, b, np.zeros((num_arms, self.dim)))
+
+        # Tie-break draws use a per-thread NumPy RNG (Generator is not thread-safe)
+        self._local = threading.local()
+
+    def _features(self, contexts: np.ndarray) -> np.ndarray:
+        contexts = np.asarray(contexts, dtype=np.float64).reshape(-1, self.context_size)
+        return np.hstack([contexts, np.ones((len(contexts), 1))])
+
+    def upper_bounds(self, contexts: np.ndarray) -> np.ndarray:
+        """UCB of every arm for every row, (N, num_arms)"""
+        a_inv, _, theta = self._snapshot
+        x = self._features(contexts)
+        mean = x @ theta.T
+        variance = np.einsum('nd,ade,ne->na', x, a_inv, x)
+        return mean + self.alpha * np.sqrt(np.maximum(variance, 0.0))
+
+    def _rng(self) -> np.random.Generator:
+        rng = getattr(self._local, 'rng', None)
+        if rng is None:
+            rng = self._local.rng = np.random.default_rng()
+        return rng
+
+    def select(self, contexts: np.ndarray) -> np.ndarray:
+        """Arm with the highest upper confidence bound per row, ties broken at random"""
+        bounds = self.upper_bounds(contexts)
+        ties = np.isclose(bounds, bounds.max(axis=1, keepdims=True), rtol=1e-12, atol=1e-12)
+        return np.argmax(np.where(ties, self._rng().random(bounds.shape), -1.0), axis=1)
+
+    def update(self, arm_indices: np.ndarray, contexts: np.ndarray, rewards: np.ndarray):
+        """Apply (arm, context, reward) observations in order (single writer)"""
+        a_inv, b, theta = self._snapshot
+        a_inv, b, theta = a_inv.copy(), b.copy(), theta.copy()
+        x = self._features(contexts)
+
+        for arm, row, reward in zip(np.asarray(arm_indices, dtype=np.int64), x, rewards):
+            # Sherman-Morrison: (A + x x^T)^-1 = A^-1 - (A^-1 x)(A^-1 x)^T / (1 + x^T A^-1 x)
+            a_inv_x = a_inv[arm] @ row
+            a_inv[arm] -= np.outer(a_inv_x, a_inv_x) / (1.0 + row @ a_inv_x)
+            b[arm] += reward * row
+
+        touched = np.unique(np.asarray(arm_indices, dtype=np.int64))
+        theta[touched] = np.einsum('ade,ae->ad', a_inv[touched], b[touched])
+        self._snapshot = (a_inv, b, theta)
+
+    def get_state(self) -> Dict:
+        a_inv, b, _ = self._snapshot
+        return {'alpha': self.alpha, 'a_inv': a_inv.tolist(), 'b': b.tolist()}
+
+    def set_state(self, state: Dict):
+        a_inv = np.asarray(state['a_inv'], dtype=np.float64)
+        b = np.asarray(state['b'], dtype=np.float64)
+        if a_inv.shape != (self.num_arms, self.dim, self.dim) or b.shape != (self.num_arms, self.dim):
+            raise ValueError(f"LinUCB state shape {a_inv.shape} does not match ({self.num_arms}, {self.dim}, {self.dim})")
+        self._snapshot = (a_inv, b, np.einsum('ade,ae->ad', a_inv, b))
+
+    def parameters(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Current (A_inv, theta)"""
+        a_inv, _, theta = self._snapshot
+        return a_inv, theta
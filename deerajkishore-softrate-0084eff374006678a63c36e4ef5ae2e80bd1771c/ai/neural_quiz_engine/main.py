@@ -6,12 +6,18 @@ from lpa_estimation import LPAEstimationBrain
 from role_recommendation import RoleRecommendationBrain
 from job_readiness import JobReadinessBrain
 from knowledge_state import KnowledgeStateBrain
+from knowledge_store import KnowledgeStore
+from knowledge_snapshot import PopulationSnapshot
 from bandit_scoring import BanditScoringBrain
 from answer_brain import AnswerUnderstandingBrain
 from topic_extractor import TopicExtractorBrain
 from difficulty_adapter import DifficultyAdapterBrain
 from orchestrator import QuizOrchestrator
+from topic_registry import TOPICS
+from question_precompute import QuestionPrecomputer
+from answer_features import FEATURES_FIELD, features_match
 from database.mongodb_client import mongodb_client
+from config import DynamicConfig
 import os
 import sys
 import json
@@ -63,6 +69,11 @@ class NeuralQuizEngine:
         # Database stats
         self._show_database_stats()
 
+    def shutdown(self):
+        """Flush background state (bandit rewards, knowledge training + store) before exit"""
+        self.bandit_brain.close()
+        self.knowledge_brain.close()
+
     def _show_database_stats(self):
         """Show real database statistics"""
         try:
@@ -108,16 +119,74 @@ class NeuralQuizEngine:
         self.orchestrator = QuizOrchestrator()
 
         # Brain 2: Topic Extractor
-        self.topic_extractor = TopicExtractorBrain()
+        self.topic_extractor = TopicExtractorBrain(
+            vocab_size=DynamicConfig.VOCAB_SIZE,
+            num_topics=DynamicConfig.NUM_TOPICS,
+            vocabulary_path=DynamicConfig.TOPIC_VOCAB_PATH
+        )
 
         # Brain 3: Answer Understanding
-        self.answer_brain = AnswerUnderstandingBrain()
+        self.answer_brain = AnswerUnderstandingBrain(
+            vocab_size=DynamicConfig.ANSWER_VOCAB_SIZE,
+            enable_cache=DynamicConfig.ENABLE_CACHING,
+            cache_size=DynamicConfig.EMBEDDING_CACHE_SIZE,
+            cache_ttl=DynamicConfig.CACHE_TTL,
+            use_compiled_encoder=DynamicConfig.COMPILED_ENCODER,
+            cascade_tolerance=DynamicConfig.CASCADE_TOLERANCE,
+            verdict_cache_size=DynamicConfig.VERDICT_CACHE_SIZE,
+            vocabulary_path=DynamicConfig.ANSWER_VOCAB_PATH
+        )
+        for name, brain in (('Topic', self.topic_extractor), ('Answer', self.answer_brain)):
+            if not brain.vocabulary_loaded:
+                print(f"   ⚠️  {name} vocabulary not found, run build_vocabulary.py")
+        if os.path.exists(DynamicConfig.ANSWER_WEIGHTS_PATH):
+            self.answer_brain.load_trained_weights(DynamicConfig.ANSWER_WEIGHTS_PATH)
+        if DynamicConfig.COMPILED_ENCODER:
+            self.answer_brain.warmup()
+        if DynamicConfig.BENCHMARK_ENCODER:
+            bench = self.answer_brain.benchmark_encoder(
+                ["a primary key uniquely identifies each record"] * 32)
+            print(f"   ⏱️  Answer encoder (batch {bench['batch_size']}): "
+                  f"eager {bench['eager_ms']:.2f}ms | compiled {bench['compiled_ms']:.2f}ms "
+                  f"({bench['speedup']:.1f}x)")
 
         # Brain 4: Bandit Scoring
-        self.bandit_brain = BanditScoringBrain()
-
-        # Brain 5: Knowledge State
-        self.knowledge_brain = KnowledgeStateBrain()
+        self.bandit_brain = BanditScoringBrain(
+            context_size=DynamicConfig.CONTEXT_SIZE,
+            num_arms=DynamicConfig.NUM_ARMS,
+            engine=DynamicConfig.BANDIT_ENGINE,
+            linucb_alpha=DynamicConfig.LINUCB_ALPHA,
+            merge_interval=DynamicConfig.BANDIT_MERGE_INTERVAL
+        )
+        if self.db.db is not None:
+            # Warm-start arm statistics; the update worker checkpoints them
+            if self.bandit_brain.enable_checkpointing(
+                    self.db.db[DynamicConfig.BANDIT_STATE_COLLECTION],
+                    interval=DynamicConfig.BANDIT_CHECKPOINT_INTERVAL):
+                print(f"   ♻️  Bandit warm-started ({self.bandit_brain.get_arm_statistics()['total_selections']:.0f} rewards)")
+
+        # Brain 5: Knowledge State (users loaded lazily, persisted write-behind)
+        try:
+            knowledge_snapshot = PopulationSnapshot.open(DynamicConfig.KNOWLEDGE_SNAPSHOT_PATH)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️  Ignoring knowledge snapshot: {e}")
+            knowledge_snapshot = None
+        knowledge_store = KnowledgeStore(
+            self.db.db[DynamicConfig.KNOWLEDGE_COLLECTION] if self.db.db is not None else None,
+            max_users=DynamicConfig.KNOWLEDGE_CACHE_USERS,
+            flush_interval=DynamicConfig.KNOWLEDGE_FLUSH_INTERVAL,
+            ttl=DynamicConfig.KNOWLEDGE_CACHE_TTL,
+            snapshot=knowledge_snapshot
+        )
+        if knowledge_store.collection is None:
+            print("   ⚠️  No database: user knowledge is kept in memory only")
+        if knowledge_snapshot is not None:
+            print(f"   🗺️  Knowledge snapshot mapped ({len(knowledge_snapshot)} users)")
+        self.knowledge_brain = KnowledgeStateBrain(
+            num_topics=DynamicConfig.NUM_TOPICS,
+            store=knowledge_store,
+            train_interval=DynamicConfig.KNOWLEDGE_TRAIN_INTERVAL
+        )
 
         # Brain 6: Job Readiness
         self.job_readiness_brain = JobReadinessBrain()
@@ -130,6 +199,15 @@ class NeuralQuizEngine:
 
         print("✅ All 8 Neural Brains Initialized")
 
+        # Derived question fields for new / edited quizzes (POST /precompute_quiz)
+        self.question_precomputer = QuestionPrecomputer(
+            self.db.db[self.db.QUESTIONS_COLLECTION],
+            self.db.db[self.db.QUIZZES_COLLECTION],
+            self.topic_extractor,
+            answer_brain=self.answer_brain if DynamicConfig.PRECOMPUTE_EMBEDDINGS else None,
+            default_difficulty=DynamicConfig.DEFAULT_DIFFICULTY
+        ) if self.db.db is not None else None
+
     def get_available_quizzes(self) -> List[Dict]:
         """Get all available quizzes from MongoDB"""
         return self.db.get_available_quizzes()
@@ -161,6 +239,7 @@ class NeuralQuizEngine:
 
             # Extract topics for each question
             print("   Processing: Extracting topics from questions...")
+            untagged = []
             for i, question in enumerate(questions, 1):
                 if 'question_text' not in question and 'text' in question:
                     question['question_text'] = question['text']
@@ -168,12 +247,30 @@ class NeuralQuizEngine:
                 # Normalize correct_answer
                 if 'correct_answer' not in question and 'correctAnswer' in question:
                     question['correct_answer'] = question['correctAnswer']
+
+                # Fields written by precompute_questions.py (ignored if the question was edited since)
+                features = question.get(FEATURES_FIELD)
+                if features_match(features, question.get('question_text', ''), question.get('correct_answer', '')):
+                    if not question.get('topics'):
+                        question['topics'] = list(features['topics'])
+                    if not isinstance(question.get('difficulty'), (int, float)):
+                        question['difficulty'] = features['difficulty']
                 
                 if 'topics' not in question or not question['topics']:
-                    text_to_analyze = question.get('question_text', '')
-                    topics = self.topic_extractor.extract_topics(text_to_analyze)
+                    untagged.append(question)
+
+            # One batched extraction (keyword misses share a single model call)
+            if untagged:
+                texts = [question.get('question_text', '') for question in untagged]
+                for question, topics in zip(untagged, self.topic_extractor.extract_topics_batch(texts)):
                     question['topics'] = topics
 
+            # Precomputed token sets / reference embeddings go straight into the scoring caches
+            precomputed = self.answer_brain.load_question_features(questions)
+            if precomputed < total_questions:
+                print(f"   ℹ️ {total_questions - precomputed} questions without precomputed features "
+                      f"(run precompute_questions.py)")
+
             # Show question analysis
             # self._analyze_loaded_questions(questions)
 
@@ -250,6 +347,8 @@ class NeuralQuizEngine:
                 # Score the answer
                 correct_ans = question.get('correct_answer', question.get('correctAnswer', 'N/A'))
                 is_mcq = False
+                # MCQs get their rule-based explanation in generate_report
+                explanation = None
                 
                 # Check if it's an MCQ
                 if 'options' in question and question['options']:
@@ -278,12 +377,14 @@ class NeuralQuizEngine:
                         except ValueError:
                             similarity = 0.0
                 else:
-                    # Descriptive: Use AI Brain
-                    similarity = self.answer_brain.score_answer(
+                    # Descriptive: Use AI Brain (score + explanation in one pass)
+                    result = self.answer_brain.score_and_explain(
                         user_answer, 
                         correct_ans,
                         question_text=question.get('question_text', '')
                     )
+                    similarity = result['score']
+                    explanation = result['explanation']
 
                 # Get topic mastery for context
                 topic_mastery = 0.5
@@ -337,7 +438,8 @@ class NeuralQuizEngine:
                     'time_bonus': round(time_bonus, 3),
                     'difficulty': question.get('difficulty', 0.5),
                     'topics': question.get('topics', [question.get('topic', 'General')]),
-                    'scoring_arm': arm_desc
+                    'scoring_arm': arm_desc,
+                    'explanation': explanation
                 }
 
                 session_data['questions_attempted'].append(question_result)
@@ -416,55 +518,59 @@ class NeuralQuizEngine:
             # Ensure topics_covered is a list (handled in run_comprehensive_quiz but good to be safe)
             all_topics = list(session_data['performance']['topics_covered'])
 
-            for topic in all_topics:
-                mastery, confidence = self.knowledge_brain.get_mastery(
-                    user_id, topic)
+            # Session topics + Role Brain topics, read in one vectorized query
+            role_brain_topics = self.role_brain.topic_names
+            mastery_row, confidence_row = self.knowledge_brain.get_mastery_matrix(
+                [user_id], all_topics + role_brain_topics)
+            mastery_row, confidence_row = mastery_row[0], confidence_row[0]
+
+            for topic, mastery, confidence in zip(all_topics, mastery_row, confidence_row):
                 topic_mastery[topic] = {
-                    'mastery': mastery,
-                    'confidence': confidence,
+                    'mastery': float(mastery),
+                    'confidence': float(confidence),
                     'level': 'Expert' if mastery >= 0.8 else
                     'Advanced' if mastery >= 0.6 else
                     'Intermediate' if mastery >= 0.4 else
                     'Beginner'
                 }
 
-            # Get strengths and weaknesses based on THIS SESSION's performance
-            session_strengths = set()
-            session_weaknesses = set()
+            # Get strengths and weaknesses based on THIS SESSION's performance (registry bitmasks)
+            session_strengths = 0
+            session_weaknesses = 0
+
+            # Active Topic Extraction from Question Text with Context
+            # We do this NOW to ensure we have granular topics even if DB was generic
+            # (one batched call for the whole session)
+            attempted_topics = self.topic_extractor.extract_topics_batch(
+                [q_data.get('question_text', '') for q_data in session_data['questions_attempted']],
+                context=session_data.get('quiz_title', ''))
             
-            for q_data in session_data['questions_attempted']:
+            for q_data, q_topics in zip(session_data['questions_attempted'], attempted_topics):
                 score = q_data['final_score']
                 
-                # Active Topic Extraction from Question Text with Context
-                # We do this NOW to ensure we have granular topics even if DB was generic
-                text_to_analyze = q_data.get('question_text', '') 
-                quiz_context = session_data.get('quiz_title', '')
-                q_topics = self.topic_extractor.extract_topics(text_to_analyze, context=quiz_context)
-                
                 if score >= 0.6:
-                    for t in q_topics:
-                         session_strengths.add(t)
+                    session_strengths |= TOPICS.mask(q_topics)
                 elif score < 0.6:
-                    for t in q_topics:
-                         session_weaknesses.add(t)
+                    session_weaknesses |= TOPICS.mask(q_topics)
                 
-                # --- ADDED: Generate Explanation for Report ---
-                # We add it directly to the question object in the session data (which goes into the report)
-                try:
-                    explanation = self.answer_brain.generate_explanation(
-                        user_answer=q_data.get('user_answer', ''),
-                        correct_answer=q_data.get('correct_answer', ''),
-                        question_text=q_data.get('question_text', '')
-                    )
-                    q_data['explanation'] = explanation
-                except Exception as exp_e:
-                    q_data['explanation'] = "Could not generate explanation."
-                    print(f"⚠️ Error generating explanation: {exp_e}")
+                # --- Explanation for Report ---
+                # Reuse the explanation stored at scoring time; MCQs (stored with
+                # explanation None) and legacy sessions get one generated
+                if q_data.get('explanation') is None:
+                    try:
+                        q_data['explanation'] = self.answer_brain.generate_explanation(
+                            user_answer=q_data.get('user_answer', ''),
+                            correct_answer=q_data.get('correct_answer', ''),
+                            question_text=q_data.get('question_text', '')
+                        )
+                    except Exception as exp_e:
+                        q_data['explanation'] = "Could not generate explanation."
+                        print(f"⚠️ Error generating explanation: {exp_e}")
                 # ---------------------------------------------
             
             # Clean up overlap: If a topic is in both, consider it a weakness (needs improvement)
-            strengths = list(session_strengths - session_weaknesses)
-            weaknesses = list(session_weaknesses)
+            strengths = TOPICS.topics(session_strengths & ~session_weaknesses)
+            weaknesses = TOPICS.topics(session_weaknesses)
 
             # Calculate job readiness
             # Assuming 20 possible topics
@@ -483,14 +589,10 @@ class NeuralQuizEngine:
 
             # --- LPA & Role Integration ---
             # 1. Get mastery vector for Role Brain (10 specific topics)
-            role_brain_topics = self.role_brain.topic_names
-            mastery_vector = []
-            for t in role_brain_topics:
-                 m, _ = self.knowledge_brain.get_mastery(user_id, t)
-                 mastery_vector.append(m)
+            mastery_vector = mastery_row[len(all_topics):].tolist()
             
             # 2. Get Role Recommendation
-            role_recs = self.role_brain.recommend_roles(mastery_vector, weaknesses)
+            role_recs = self.role_brain.recommend_roles(mastery_vector, session_weaknesses)
             best_role = role_recs['top_recommendation']['name']
 
             # 3. Estimate LPA
@@ -703,7 +805,10 @@ def main():
         engine = NeuralQuizEngine()
 
         # Start interactive mode
-        engine.interactive_mode()
+        try:
+            engine.interactive_mode()
+        finally:
+            engine.shutdown()
 
     except ConnectionError as e:
         print(f"\n❌ CRITICAL: {e}")
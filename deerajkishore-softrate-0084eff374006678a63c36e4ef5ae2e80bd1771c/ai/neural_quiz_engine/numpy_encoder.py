@@ -0,0 +1,167 @@
+"""
+NumPy Answer Encoder - TensorFlow-free inference backend
+Reproduces AnswerUnderstandingBrain.encode_text from exported weights
+"""
+import numpy as np
+from typing import Dict, List, Tuple
+
+from answer_features import AnswerScoringMixin
+from vocabulary import standardize
+
+# Max abs difference vs the TensorFlow encoder (float32 round-off)
+ENCODER_TOLERANCE = 1e-4
+
+
+def export_encoder_weights(brain, filepath: str):
+    """Dump vocabulary and encoder weights of an AnswerUnderstandingBrain to .npz"""
+    # Make sure every layer is built
+    brain._encode(["export answer"], compiled=False)
+
+    forward_kernel, forward_recurrent, forward_bias = brain.lstm.forward_layer.get_weights()
+    backward_kernel, backward_recurrent, backward_bias = brain.lstm.backward_layer.get_weights()
+    dense_kernel, dense_bias = brain.dense1.get_weights()
+    norm_gamma, norm_beta = brain.normalize.get_weights()
+
+    np.savez(
+        filepath,
+        vocabulary=np.array([str(t) for t in brain.text_vectorizer.get_vocabulary()]),
+        sequence_length=np.array(brain.text_vectorizer.get_config()['output_sequence_length']),
+        embedding=brain.embedding.get_weights()[0],
+        forward_kernel=forward_kernel,
+        forward_recurrent=forward_recurrent,
+        forward_bias=forward_bias,
+        backward_kernel=backward_kernel,
+        backward_recurrent=backward_recurrent,
+        backward_bias=backward_bias,
+        dense_kernel=dense_kernel,
+        dense_bias=dense_bias,
+        norm_gamma=norm_gamma,
+        norm_beta=norm_beta,
+        norm_epsilon=np.array(brain.normalize.epsilon)
+    )
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class NumpyAnswerEncoder:
+    """Pure-NumPy forward pass: lookup -> embedding -> BiLSTM -> pool -> dense -> LayerNorm"""
+
+    def __init__(self, filepath: str):
+        weights = np.load(filepath)
+
+        vocabulary = [str(token) for token in weights['vocabulary']]
+        self.vocabulary = vocabulary
+        # Index 0 is the padding mask, index 1 the OOV token
+        self.token_index = {token: idx for idx, token in enumerate(vocabulary) if idx > 1}
+        self.sequence_length = int(weights['sequence_length'])
+
+        self.embedding = weights['embedding']
+        self.forward = (weights['forward_kernel'], weights['forward_recurrent'], weights['forward_bias'])
+        self.backward = (weights['backward_kernel'], weights['backward_recurrent'], weights['backward_bias'])
+        self.dense_kernel = weights['dense_kernel']
+        self.dense_bias = weights['dense_bias']
+        self.norm_gamma = weights['norm_gamma']
+        self.norm_beta = weights['norm_beta']
+        self.norm_epsilon = float(weights['norm_epsilon'])
+        self.units = self.forward[1].shape[0]
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        """Standardize, split and look up tokens (0 = padding, 1 = OOV)"""
+        ids = np.zeros((len(texts), self.sequence_length), dtype=np.int64)
+        for row, text in enumerate(texts):
+            tokens = standardize(text)[:self.sequence_length]
+            ids[row, :len(tokens)] = [self.token_index.get(t, 1) for t in tokens]
+        return ids
+
+    def _run_lstm(self, x: np.ndarray, mask: np.ndarray, weights, reverse: bool) -> np.ndarray:
+        """Masked LSTM over (batch, time, features); masked steps keep the previous state"""
+        kernel, recurrent, bias = weights
+        batch, steps, _ = x.shape
+        u = self.units
+
+        # Input projection for all timesteps at once
+        projected = x @ kernel + bias
+
+        h = np.zeros((batch, u), dtype=np.float32)
+        c = np.zeros((batch, u), dtype=np.float32)
+        outputs = np.zeros((batch, steps, u), dtype=np.float32)
+
+        order = range(steps - 1, -1, -1) if reverse else range(steps)
+        for t in order:
+            z = projected[:, t] + h @ recurrent
+            i = _sigmoid(z[:, :u])
+            f = _sigmoid(z[:, u:2 * u])
+            g = np.tanh(z[:, 2 * u:3 * u])
+            o = _sigmoid(z[:, 3 * u:])
+
+            c_new = f * c + i * g
+            h_new = o * np.tanh(c_new)
+
+            step_mask = mask[:, t:t + 1]
+            c = np.where(step_mask, c_new, c)
+            h = np.where(step_mask, h_new, h)
+            outputs[:, t] = h
+
+        return outputs
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts to (batch, 16) vectors"""
+        ids = self.vectorize(texts)
+        mask = ids > 0
+        lengths = mask.sum(axis=1, keepdims=True)
+
+        # Only run the recurrence up to the longest text in the batch
+        steps = max(1, int(lengths.max())) if len(texts) else 1
+        ids, mask = ids[:, :steps], mask[:, :steps]
+
+        x = self.embedding[ids]
+        hidden = np.concatenate([
+            self._run_lstm(x, mask, self.forward, reverse=False),
+            self._run_lstm(x, mask, self.backward, reverse=True)
+        ], axis=-1)
+
+        # Masked average pooling (empty texts pool to zeros)
+        pooled = (hidden * mask[:, :, None]).sum(axis=1) / np.maximum(lengths, 1)
+
+        dense = np.maximum(pooled @ self.dense_kernel + self.dense_bias, 0.0)
+
+        mean = dense.mean(axis=-1, keepdims=True)
+        var = dense.var(axis=-1, keepdims=True)
+        normalized = (dense - mean) / np.sqrt(var + self.norm_epsilon)
+        return (normalized * self.norm_gamma + self.norm_beta).astype(np.float32)
+
+
+class NumpyAnswerScorer(AnswerScoringMixin):
+    """Answer scoring without TensorFlow, backed by NumpyAnswerEncoder"""
+
+    def __init__(self, filepath: str, enable_cache: bool = True,
+                 cache_size: int = 2048, cache_ttl: int = 300, cascade_tolerance: float = 0.0,
+                 verdict_cache_size: int = 4096):
+        self.encoder = NumpyAnswerEncoder(filepath)
+        self._init_scoring_caches(enable_cache, cache_size, cache_ttl, verdict_cache_size)
+        self._init_cascade(cascade_tolerance)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.encoder.encode(texts)
+
+    def _encoder_arrays(self) -> Tuple[List[str], List[np.ndarray]]:
+        encoder = self.encoder
+        return encoder.vocabulary, [
+            encoder.embedding, *encoder.forward, *encoder.backward,
+            encoder.dense_kernel, encoder.dense_bias, encoder.norm_gamma, encoder.norm_beta
+        ]
+
+
+def verify_encoder(brain, encoder: NumpyAnswerEncoder, texts: List[str]) -> Dict:
+    """Compare NumPy and TensorFlow encoder outputs on sample texts"""
+    expected = brain._encode(texts, compiled=False)
+    actual = encoder.encode(texts)
+    max_abs_diff = float(np.max(np.abs(expected - actual))) if len(texts) else 0.0
+    return {
+        'samples': len(texts),
+        'max_abs_diff': max_abs_diff,
+        'tolerance': ENCODER_TOLERANCE,
+        'passed': max_abs_diff <= ENCODER_TOLERANCE
+    }
@@ -0,0 +1,85 @@
+"""
+Precompute derived question fields in MongoDB
+Backfills every question (questions collection + questions embedded in
+quizzes), or one quiz, with the fields load_all_questions_for_quiz and
+answer scoring read instead of deriving them per request. --watch keeps
+running and precomputes quizzes / questions as they are created or edited.
+Usage: python precompute_questions.py [--quiz-id ID] [--force] [--no-embeddings] [--watch]
+"""
+import argparse
+import os
+import time
+
+from config import DynamicConfig
+from database.mongodb_client import mongodb_client
+from answer_brain import AnswerUnderstandingBrain
+from question_precompute import QuestionPrecomputer
+from topic_extractor import TopicExtractorBrain
+
+
+def load_brains(embeddings: bool):
+    """Topic extractor (+ answer encoder) configured exactly like the serving engine"""
+    topic_extractor = TopicExtractorBrain(
+        vocab_size=DynamicConfig.VOCAB_SIZE,
+        num_topics=DynamicConfig.NUM_TOPICS,
+        vocabulary_path=DynamicConfig.TOPIC_VOCAB_PATH
+    )
+    if not embeddings:
+        return topic_extractor, None
+
+    answer_brain = AnswerUnderstandingBrain(
+        vocab_size=DynamicConfig.ANSWER_VOCAB_SIZE,
+        use_compiled_encoder=DynamicConfig.COMPILED_ENCODER,
+        vocabulary_path=DynamicConfig.ANSWER_VOCAB_PATH
+    )
+    if os.path.exists(DynamicConfig.ANSWER_WEIGHTS_PATH):
+        answer_brain.load_trained_weights(DynamicConfig.ANSWER_WEIGHTS_PATH)
+    else:
+        print(f"⚠️  {DynamicConfig.ANSWER_WEIGHTS_PATH} not found: embeddings match an untrained encoder")
+    return topic_extractor, answer_brain
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute derived fields on question documents")
+    parser.add_argument('--quiz-id', help="only the questions of this quiz")
+    parser.add_argument('--force', action='store_true', help="recompute fields that are still current")
+    parser.add_argument('--no-embeddings', action='store_true', help="skip reference embeddings")
+    parser.add_argument('--watch', action='store_true', help="then follow new / edited quizzes (change stream)")
+    args = parser.parse_args()
+
+    if mongodb_client.db is None:
+        raise SystemExit("❌ No MongoDB connection")
+
+    embeddings = DynamicConfig.PRECOMPUTE_EMBEDDINGS and not args.no_embeddings
+    topic_extractor, answer_brain = load_brains(embeddings)
+    precomputer = QuestionPrecomputer(
+        mongodb_client.db[DynamicConfig.QUESTIONS_COLLECTION],
+        mongodb_client.db[DynamicConfig.QUIZZES_COLLECTION],
+        topic_extractor,
+        answer_brain=answer_brain,
+        default_difficulty=DynamicConfig.DEFAULT_DIFFICULTY
+    )
+    if answer_brain is not None:
+        print(f"🔑 Encoder fingerprint: {answer_brain.encoder_fingerprint()}")
+
+    start = time.perf_counter()
+    if args.quiz_id:
+        print(f"📥 Precomputing quiz {args.quiz_id}...")
+        written = precomputer.precompute_quiz(args.quiz_id, force=args.force)
+    else:
+        print(f"📥 Backfilling {DynamicConfig.QUESTIONS_COLLECTION} and {DynamicConfig.QUIZZES_COLLECTION}...")
+        written = precomputer.backfill_questions(force=args.force) + precomputer.backfill_quizzes(force=args.force)
+    print(f"✅ {written} questions written in {time.perf_counter() - start:.1f}s")
+
+    if args.watch:
+        print("👀 Watching for new / edited quizzes (Ctrl+C to stop)...")
+        try:
+            for collection, document_id, written in precomputer.watch():
+                if written:
+                    print(f"   ✅ {collection} {document_id}: {written} questions")
+        except KeyboardInterrupt:
+            print("👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Question Precompute - Derived fields stored on question documents
+Everything serving would otherwise derive per load / per answer is written
+once under FEATURES_FIELD: normalized texts, question and reference token
+sets, topics + topic ids, a numeric difficulty and (optionally) the
+reference embedding. Questions live in the questions collection or
+embedded in quiz documents.
+"""
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+from answer_features import FEATURES_FIELD, features_match, question_features
+from topic_registry import TOPICS
+
+# Numeric difficulty for documents that store a level name
+DIFFICULTY_LEVELS = {'easy': 0.3, 'medium': 0.5, 'hard': 0.8}
+
+
+def question_texts(question: Dict) -> Tuple[str, str]:
+    """(question_text, correct_answer) with the field fallbacks of load_all_questions_for_quiz"""
+    question_text = question['question_text'] if 'question_text' in question else question.get('text', '')
+    correct_answer = question['correct_answer'] if 'correct_answer' in question else question.get('correctAnswer', '')
+    return question_text, correct_answer
+
+
+def difficulty_value(difficulty, default: float = 0.5) -> float:
+    """Numeric difficulty of a document (numbers kept, level names mapped)"""
+    if isinstance(difficulty, (int, float)) and not isinstance(difficulty, bool):
+        return float(difficulty)
+    if isinstance(difficulty, str):
+        return DIFFICULTY_LEVELS.get(difficulty.strip().lower(), default)
+    return default
+
+
+def _only_features(updated_fields: Dict) -> bool:
+    """Change-stream update that only wrote derived fields (our own writes)"""
+    return bool(updated_fields) and all(FEATURES_FIELD in key.split('.') for key in updated_fields)
+
+
+class QuestionPrecomputer:
+    """Derives the per-question fields and writes them back to MongoDB"""
+
+    def __init__(self, questions, quizzes, topic_extractor, answer_brain=None,
+                 default_difficulty: float = 0.5):
+        self.questions = questions  # questions collection
+        self.quizzes = quizzes  # quizzes collection
+        self.topic_extractor = topic_extractor
+        # Without an answer brain no reference embeddings are stored
+        self.answer_brain = answer_brain
+        self.default_difficulty = default_difficulty
+
+    def _current(self, question: Dict, fingerprint: Optional[str]) -> bool:
+        features = question.get(FEATURES_FIELD)
+        if not features_match(features, *question_texts(question)):
+            return False
+        if question.get('topics') and list(question['topics']) != features.get('topics'):
+            return False
+        return fingerprint is None or features.get('encoder') == fingerprint
+
+    def derive(self, questions: List[Dict], force: bool = False) -> List[Optional[Dict]]:
+        """Features of each question; None where the stored ones are still current"""
+        fingerprint = self.answer_brain.encoder_fingerprint() if self.answer_brain is not None else None
+        pending = [i for i, question in enumerate(questions) if force or not self._current(question, fingerprint)]
+        derived = [None] * len(questions)
+        if not pending:
+            return derived
+
+        texts = [question_texts(questions[i]) for i in pending]
+
+        # Topics the serving path would extract (untagged questions, no context), in one batch
+        untagged = [k for k, i in enumerate(pending) if not questions[i].get('topics')]
+        extracted = dict(zip(untagged, self.topic_extractor.extract_topics_batch(
+            [str(texts[k][0]) for k in untagged]))) if untagged else {}
+
+        # Reference embeddings in one encoder pass
+        embeddings = self.answer_brain.encode_references([correct for _, correct in texts]) \
+            if fingerprint is not None else None
+
+        for k, i in enumerate(pending):
+            question = questions[i]
+            features = question_features(*texts[k])
+            topics = list(question.get('topics') or extracted[k])
+            features.update({
+                'topics': topics,
+                # Registry ids are stable only for canonical topics
+                'topic_ids': [int(t) if 0 <= t < TOPICS.num_canonical else -1 for t in TOPICS.ids(topics)],
+                'difficulty': difficulty_value(question.get('difficulty'), self.default_difficulty),
+                'computed_at': datetime.now()
+            })
+            if embeddings is not None:
+                features['reference_embedding'] = embeddings[k].tolist()
+                features['encoder'] = fingerprint
+            derived[i] = features
+        return derived
+
+    # --- Writers ---
+
+    def _write_questions(self, documents: List[Dict], force: bool) -> int:
+        operations = [
+            UpdateOne({'_id': document['_id']}, {'$set': {FEATURES_FIELD: features}})
+            for document, features in zip(documents, self.derive(documents, force))
+            if features is not None
+        ]
+        if operations:
+            self.questions.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def backfill_questions(self, force: bool = False, query: Optional[Dict] = None,
+                           batch_size: int = 500) -> int:
+        """Precompute documents of the questions collection; returns questions written"""
+        written = 0
+        batch = []
+        for document in self.questions.find(query or {}).batch_size(batch_size):
+            batch.append(document)
+            if len(batch) == batch_size:
+                written += self._write_questions(batch, force)
+                batch = []
+        if batch:
+            written += self._write_questions(batch, force)
+        return written
+
+    def _write_quiz(self, quiz: Dict, force: bool) -> int:
+        questions = quiz.get('questions') or []
+        written = 0
+
+        # Embedded questions: positional updates. If the array is reordered
+        # meanwhile, the source hash makes serving ignore the misplaced fields.
+        embedded = [i for i, question in enumerate(questions) if isinstance(question, dict)]
+        if embedded:
+            derived = self.derive([questions[i] for i in embedded], force)
+            updates = {
+                f'questions.{i}.{FEATURES_FIELD}': features
+                for i, features in zip(embedded, derived) if features is not None
+            }
+            if updates:
+                self.quizzes.update_one({'_id': quiz['_id']}, {'$set': updates})
+                written += len(updates)
+
+        # Referenced questions live in the questions collection
+        referenced = [ObjectId(q) if isinstance(q, str) else q for q in questions if isinstance(q, (str, ObjectId))]
+        if referenced:
+            written += self.backfill_questions(force, query={'_id': {'$in': referenced}})
+        return written
+
+    def precompute_quiz(self, quiz_id, force: bool = False) -> int:
+        """Precompute every question of one quiz (hook for newly created quizzes)"""
+        if isinstance(quiz_id, str):
+            quiz_id = ObjectId(quiz_id)
+        quiz = self.quizzes.find_one({'_id': quiz_id}, {'questions': 1})
+        return self._write_quiz(quiz, force) if quiz is not None else 0
+
+    def backfill_quizzes(self, force: bool = False) -> int:
+        """Precompute the questions embedded in (or referenced by) every quiz"""
+        written = 0
+        for quiz in self.quizzes.find({'questions.0': {'$exists': True}}, {'questions': 1}):
+            written += self._write_quiz(quiz, force)
+        return written
+
+    def watch(self) -> Iterator[Tuple[str, object, int]]:
+        """
+        Precompute questions and quizzes as they are inserted or edited.
+        Blocks on a change stream (needs a replica set, e.g. Atlas) and
+        yields (collection, document id, questions written) per change.
+        """
+        collections = [self.questions.name, self.quizzes.name]
+        pipeline = [{'$match': {
+            'operationType': {'$in': ['insert', 'update', 'replace']},
+            'ns.coll': {'$in': collections}
+        }}]
+        with self.questions.database.watch(pipeline, full_document='updateLookup') as stream:
+            for change in stream:
+                if change['operationType'] == 'update' and \
+                        _only_features(change['updateDescription'].get('updatedFields', {})):
+                    continue
+                document = change.get('fullDocument')
+                if document is None:
+                    continue  # deleted before the lookup
+
+                collection = change['ns']['coll']
+                if collection == self.questions.name:
+                    written = self._write_questions([document], force=False)
+                else:
+                    written = self._write_quiz(document, force=False)
+                yield collection, document['_id'], written
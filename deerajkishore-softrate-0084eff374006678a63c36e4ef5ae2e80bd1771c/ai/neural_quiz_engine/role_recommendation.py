@@ -4,7 +4,9 @@ Recommends career roles based on topic mastery
 """
 import tensorflow as tf
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Union
+
+from topic_registry import TOPICS
 
 
 class RoleRecommendationBrain(tf.keras.Model):
@@ -86,11 +88,12 @@ class RoleRecommendationBrain(tf.keras.Model):
             [0.7, 0.9, 0.3, 0.6, 0.8, 0.9, 0.4, 0.3, 0.7, 0.6],  # ML Engineer
         ], dtype=tf.float32)
 
-        # Topic names in order
+        # Topic names in order (columns of role_topic_matrix) and their registry ids
         self.topic_names = [
             'DBMS', 'Python', 'JavaScript', 'Java', 'Data Structures',
             'Algorithms', 'Networking', 'OS', 'System Design', 'OOPS'
         ]
+        self.topic_ids = TOPICS.ids(self.topic_names)
 
         # Neural classifier
         self.classifier = tf.keras.Sequential([
@@ -105,12 +108,12 @@ class RoleRecommendationBrain(tf.keras.Model):
         return self.classifier(inputs, training=training)
 
     def recommend_roles(self, mastery_vector: List[float],
-                        weak_topics: List[str]) -> Dict[str, List[Dict]]:
-        """Recommend roles based on topic mastery and weaknesses"""
+                        weak_topics: Union[int, List[str]]) -> Dict[str, List[Dict]]:
+        """Recommend roles based on topic mastery and weaknesses (topic names or a registry bitmask)"""
 
         # Create weakness vector (1 for weak topic, 0 otherwise)
-        weakness_vector = [1.0 if topic in weak_topics else 0.0
-                           for topic in self.topic_names]
+        weak_mask = weak_topics if isinstance(weak_topics, int) else TOPICS.mask(weak_topics)
+        weakness_vector = TOPICS.mask_vector(weak_mask, self.topic_ids).tolist()
 
         # Combine mastery and weakness vectors
         input_vector = mastery_vector + weakness_vector
@@ -37,6 +37,11 @@ except Exception as e:
     logger.error(f"Failed to initialize engine: {e}")
     engine = None
 
+@app.on_event("shutdown")
+def shutdown_engine():
+    if engine:
+        engine.shutdown()
+
 class QuizStartRequest(BaseModel):
     user_id: str
     quiz_id: str
@@ -72,6 +77,29 @@ def serialize_for_api(data):
         
     return data
 
+def mcq_similarity(user_response, correct_answer, options) -> float:
+    """Direct Match or Option Index Match ("A".."D" or 1-based number)"""
+    user_clean = str(user_response).strip().lower()
+    correct_clean = str(correct_answer).strip().lower()
+
+    if user_clean == correct_clean:
+        return 1.0
+
+    try:
+        idx = -1
+        if user_clean in ['a', 'b', 'c', 'd']:
+            idx = ord(user_clean) - ord('a')
+        elif str(user_response).isdigit():
+            idx = int(user_response) - 1
+
+        if 0 <= idx < len(options):
+            selected_option_text = str(options[idx]).strip().lower()
+            if selected_option_text == correct_clean:
+                return 1.0
+    except Exception:
+        pass
+    return 0.0
+
 @app.post("/start_quiz")
 def start_quiz(request: QuizStartRequest):
     if not engine:
@@ -161,6 +189,7 @@ def submit_answer(request: QuizAnswerRequest):
         options = current_q.get('options', [])
         
         is_mcq = bool(options)
+        score_breakdown = None
         
         if is_mcq:
              if str(u_ans).strip().lower() == str(c_ans).strip().lower():
@@ -168,7 +197,10 @@ def submit_answer(request: QuizAnswerRequest):
              else:
                  similarity = 0.0
         else:
-             similarity = engine.answer_brain.score_answer(u_ans, c_ans, question_text=q_text)
+             # Score + explanation from one shared tokenization
+             result = engine.answer_brain.score_and_explain(u_ans, c_ans, question_text=q_text)
+             similarity = result['score']
+             score_breakdown = result['components']
              
         # --- BANDIT SCORING INTEGRATION ---
         # Calculate Context Factors
@@ -195,26 +227,21 @@ def submit_answer(request: QuizAnswerRequest):
         # though usually we trust 1.0 as 1.0.
         # For Descriptive (is_mcq=False), this is CRITICAL.
         
+        bandit_context = None
         if is_mcq:
             final_score = similarity
             arm_idx = -1
             arm_desc = "MCQ_Exact"
-            explanation = f"The correct answer is {c_ans}."
+            explanation = None  # MCQs get their rule-based explanation in generate_report
         else:
-            final_score, arm_idx, arm_desc = engine.bandit_brain.score_answer(
-                similarity=similarity,
-                difficulty=difficulty,
-                time_taken=request.time_taken,
-                topic_mastery=mastery,
-                previous_performance=prev_perf,
-                time_bonus=time_bonus
-            )
-            # GENERATE EXPLANATION IMMEDIATELY
-            explanation = engine.answer_brain.generate_explanation(
-                user_answer=u_ans,
-                correct_answer=c_ans,
-                question_text=q_text
+            context = engine.bandit_brain.create_context_matrix(
+                [similarity], [difficulty], [request.time_taken], [mastery], [prev_perf], [time_bonus]
             )
+            scores, arms, descs = engine.bandit_brain.score_batch(context)
+            final_score, arm_idx, arm_desc = float(scores[0]), int(arms[0]), descs[0]
+            # Kept with the attempt so a later regrade can reward this arm (see /regrade_answer)
+            bandit_context = context[0].tolist()
+            explanation = result['explanation']
         
         marks_obtained = final_score * 10
         
@@ -229,6 +256,10 @@ def submit_answer(request: QuizAnswerRequest):
              'marks_obtained': marks_obtained,
              'final_score': final_score,
              'explanation': explanation, # SAVED IMMEDIATELY
+             'score_breakdown': score_breakdown,
+             'scoring_arm': arm_desc,
+             'bandit_arm': arm_idx,
+             'bandit_context': bandit_context,
              'time_taken': request.time_taken,
              'difficulty': current_q.get('difficulty', 0.5),
              'topics': current_q.get('topics', ['General'])
@@ -406,9 +437,8 @@ def submit_quiz_bulk(request: BulkQuizSubmission):
             'status': 'completed' # Mark as completed immediately
         }
         
-        # 3. Process Answers
-        total_score = 0
-        
+        # 3. Resolve Questions
+        resolved = []
         for ans in request.answers:
             q_id = ans.get('questionId') or ans.get('question_id')
             user_response = ans.get('answer', '')
@@ -429,78 +459,82 @@ def submit_quiz_bulk(request: BulkQuizSubmission):
             if not question:
                 logger.warning(f"Question not found for ID: {q_id}")
                 continue
-                
-            # Score Answer
+
+            resolved.append((q_id, user_response, time_spent, question))
+
+        # AI Scoring: all descriptive answers in one batched model invocation
+        descriptive = [i for i, (_, _, _, question) in enumerate(resolved) if not question.get('options', [])]
+        batch_results = engine.answer_brain.score_and_explain_batch(
+            [resolved[i][1] for i in descriptive],
+            [resolved[i][3].get('correct_answer', '') for i in descriptive],
+            [resolved[i][3].get('question_text', '') for i in descriptive]
+        )
+        descriptive_results = dict(zip(descriptive, batch_results))
+
+        # 4. Similarity for every answer (MCQ exact/option match, descriptive from the batch)
+        similarities = []
+        for i, (q_id, user_response, time_spent, question) in enumerate(resolved):
+            if question.get('options', []):
+                similarities.append(mcq_similarity(user_response, question.get('correct_answer', ''), question['options']))
+            else:
+                similarities.append(descriptive_results[i]['score'])
+
+        # --- BANDIT SCORING INTEGRATION ---
+        # One bandit invocation for all descriptive answers. Mastery is the
+        # snapshot at submission time; previous performance is the running
+        # mean similarity of the answers before each one.
+        mastery_by_topic = {}
+        bandit_rows = {}
+        if descriptive:
+            difficulties, times, masteries, prev_perfs, time_bonuses = [], [], [], [], []
+            running = np.cumsum([0.0] + similarities)
+            for i in descriptive:
+                _, _, time_spent, question = resolved[i]
+                similarity = similarities[i]
+                topics = question.get('topics', ['General'])
+                primary_topic = topics[0] if topics else 'General'
+                if primary_topic not in mastery_by_topic:
+                    mastery_by_topic[primary_topic], _ = engine.knowledge_brain.get_mastery(request.user_id, primary_topic)
+
+                # Time Bonus
+                time_bonus = 0.0
+                expected_time = 60.0
+                if time_spent < expected_time and similarity > 0.4:
+                    time_bonus = 0.05 * (1 - (time_spent / expected_time))
+
+                difficulties.append(question.get('difficulty', 0.5))
+                times.append(time_spent)
+                masteries.append(mastery_by_topic[primary_topic])
+                prev_perfs.append(running[i] / i if i else 0.5)
+                time_bonuses.append(time_bonus)
+
+            contexts = engine.bandit_brain.create_context_matrix(
+                [similarities[i] for i in descriptive], difficulties, times,
+                masteries, prev_perfs, time_bonuses
+            )
+            bandit_scores, bandit_arms, bandit_descs = engine.bandit_brain.score_batch(contexts)
+            bandit_rows = {
+                i: (float(score), int(arm), desc, context.tolist())
+                for i, score, arm, desc, context in zip(descriptive, bandit_scores, bandit_arms, bandit_descs, contexts)
+            }
+
+        # 5. Process Answers
+        total_score = 0
+        
+        for i, (q_id, user_response, time_spent, question) in enumerate(resolved):
             c_ans = question.get('correct_answer', '')
             q_text = question.get('question_text', '')
-            options = question.get('options', [])
-            is_mcq = bool(options)
-            
-            similarity = 0.0
-            
-            if is_mcq:
-                # Direct Match or Option Index Match
-                # Direct Match or Option Index Match
-                user_clean = str(user_response).strip().lower()
-                correct_clean = str(c_ans).strip().lower()
-                
-                if user_clean == correct_clean:
-                    similarity = 1.0
-                else: 
-                     # Handle "A", "B", "C", "D" mapping to index
-                     similarity = 0.0
-                     try:
-                         idx = -1
-                         if user_clean in ['a', 'b', 'c', 'd']:
-                             idx = ord(user_clean) - ord('a')
-                         elif user_response.isdigit():
-                             idx = int(user_response) - 1
-                             
-                         if 0 <= idx < len(options):
-                             selected_option_text = str(options[idx]).strip().lower()
-                             if selected_option_text == correct_clean:
-                                 similarity = 1.0
-                     except Exception as e:
-                         pass
+            similarity = similarities[i]
+            score_breakdown = None
+
+            if i in bandit_rows:
+                final_score, arm_idx, arm_desc, bandit_context = bandit_rows[i]
+                explanation = descriptive_results[i]['explanation']
+                score_breakdown = descriptive_results[i]['components']
             else:
-                # AI Scoring
-                similarity = engine.answer_brain.score_answer(user_response, c_ans, question_text=q_text)
-                
-            # --- BANDIT SCORING INTEGRATION ---
-            difficulty = question.get('difficulty', 0.5)
-            topics = question.get('topics', ['General'])
-            primary_topic = topics[0] if topics else 'General'
-            
-            # Get Mastery Context (Approximate for bulk, as we update sequentially)
-            mastery, _ = engine.knowledge_brain.get_mastery(request.user_id, primary_topic)
-            
-            # Time Bonus
-            time_bonus = 0.0
-            expected_time = 60.0
-            if time_spent < expected_time and similarity > 0.4:
-                time_bonus = 0.05 * (1 - (time_spent / expected_time))
-            
-            # Previous Performance (Running Avg in this loop)
-            current_scores = session_data['performance']['scores']
-            prev_perf = (sum(current_scores) / (len(current_scores) * 10)) if current_scores else 0.5
-            
-            if is_mcq:
                 final_score = similarity
-                explanation = f"The correct answer is {c_ans}."
-            else:
-                 final_score, arm_idx, arm_desc = engine.bandit_brain.score_answer(
-                    similarity=similarity,
-                    difficulty=difficulty,
-                    time_taken=time_spent,
-                    topic_mastery=mastery,
-                    previous_performance=prev_perf,
-                    time_bonus=time_bonus
-                )
-                 explanation = engine.answer_brain.generate_explanation(
-                    user_answer=user_response,
-                    correct_answer=c_ans,
-                    question_text=q_text
-                 )
+                arm_idx, arm_desc, bandit_context = -1, "MCQ_Exact", None
+                explanation = None  # MCQs get their rule-based explanation in generate_report
 
             marks_obtained = final_score * 10
             
@@ -514,6 +548,10 @@ def submit_quiz_bulk(request: BulkQuizSubmission):
                  'marks_obtained': marks_obtained,
                  'final_score': final_score,
                  'explanation': explanation,
+                 'score_breakdown': score_breakdown,
+                 'scoring_arm': arm_desc,
+                 'bandit_arm': arm_idx,
+                 'bandit_context': bandit_context,
                  'time_taken': time_spent,
                  'difficulty': question.get('difficulty', 0.5),
                  'topics': question.get('topics', ['General'])
@@ -537,18 +575,18 @@ def submit_quiz_bulk(request: BulkQuizSubmission):
                      time_efficiency=1.0 - (time_spent / 120)
                  )
 
-        # 4. Finalize Session Stats
+        # 6. Finalize Session Stats
         session_data['total_duration'] = sum(session_data['performance']['time_taken'])
         session_data['performance']['average_score'] = (total_score / (len(all_questions) * 10)) if all_questions else 0
         session_data['performance']['total_score'] = total_score
         
-        # 5. Generate Report
+        # 7. Generate Report
         report = engine.generate_report(session_data)
         
-        # 6. Save to DB (Reports) - ALREADY HANDLED BY generate_report
+        # 8. Save to DB (Reports) - ALREADY HANDLED BY generate_report
         # Removing redundant save to prevent E11000 duplicate key error
                  
-        # 7. Return Result
+        # 9. Return Result
         return serialize_for_api({
             'success': True,
             'report': report,
@@ -562,6 +600,77 @@ def submit_quiz_bulk(request: BulkQuizSubmission):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+class RegradeRequest(BaseModel):
+    session_id: str
+    question_id: str
+    score: float  # corrected score of the answer, 0..1
+
+@app.post("/regrade_answer")
+def regrade_answer(request: RegradeRequest):
+    """
+    Instructor correction of a scored answer. The first regrade of a
+    bandit-scored answer is the bandit's reward signal: the arm that served
+    the score is rewarded by how close it came to the corrected one.
+    """
+    if not engine:
+        raise HTTPException(status_code=500, detail="Engine not initialized")
+    if not 0.0 <= request.score <= 1.0:
+        raise HTTPException(status_code=400, detail="score must be between 0 and 1")
+
+    try:
+        # Interactive sessions live in quiz_sessions, bulk submissions only in their report
+        for collection in (engine.db.QUIZ_SESSIONS_COLLECTION, engine.db.REPORTS_COLLECTION):
+            document = engine.db.db[collection].find_one(
+                {'session_id': request.session_id}, {'questions_attempted': 1})
+            if document:
+                break
+        else:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        attempts = document.get('questions_attempted', [])
+        position = next((k for k, attempt in enumerate(attempts)
+                         if str(attempt.get('question_id')) == request.question_id), None)
+        if position is None:
+            raise HTTPException(status_code=404, detail="Answer not found in session")
+        attempt = attempts[position]
+
+        rewarded = attempt.get('bandit_arm', -1) >= 0 and attempt.get('bandit_context') is not None \
+            and 'instructor_score' not in attempt
+        if rewarded:
+            engine.bandit_brain.record_regrades(
+                [attempt['bandit_arm']], [attempt['bandit_context']],
+                [attempt['final_score']], [request.score]
+            )
+
+        engine.db.db[collection].update_one(
+            {'_id': document['_id']},
+            {'$set': {f'questions_attempted.{position}.instructor_score': request.score}}
+        )
+        return {'success': True, 'bandit_rewarded': rewarded}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error regrading answer: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+class PrecomputeRequest(BaseModel):
+    quiz_id: str
+    force: bool = False
+
+@app.post("/precompute_quiz")
+def precompute_quiz(request: PrecomputeRequest):
+    """Hook for the backend after a quiz is created or edited: store derived question fields"""
+    if not engine or engine.question_precomputer is None:
+        raise HTTPException(status_code=500, detail="Engine not initialized")
+
+    try:
+        written = engine.question_precomputer.precompute_quiz(request.quiz_id, force=request.force)
+        logger.info(f"Precomputed {written} questions for quiz {request.quiz_id}")
+        return {'success': True, 'quiz_id': request.quiz_id, 'questions_written': written}
+    except Exception as e:
+        logger.error(f"Error precomputing quiz: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,40 @@
+"""
+Snapshot every user's knowledge state from MongoDB
+Writes the memory-mappable population snapshot that serving workers map
+on startup (KNOWLEDGE_SNAPSHOT_PATH) before falling back to MongoDB.
+Usage: python snapshot_knowledge.py [--output DIR]
+"""
+import argparse
+import os
+import time
+
+from config import DynamicConfig
+from database.mongodb_client import mongodb_client
+from knowledge_store import KnowledgeStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot all users' knowledge state")
+    parser.add_argument('--output', default=DynamicConfig.KNOWLEDGE_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    output_dir = os.path.dirname(args.output.rstrip('/'))
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if mongodb_client.db is None:
+        raise SystemExit("❌ No MongoDB connection")
+
+    # Topic rows are the shared registry's ids, as in the serving brain
+    store = KnowledgeStore(mongodb_client.db[DynamicConfig.KNOWLEDGE_COLLECTION])
+
+    print(f"📥 Streaming {DynamicConfig.KNOWLEDGE_COLLECTION} from MongoDB...")
+    start = time.perf_counter()
+    users = store.export_snapshot(args.output)
+    store.close()
+
+    print(f"✅ {users} users, {len(store.topic_names)} topics in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Spelling Index - Precomputed close-match lookup over a reference vocabulary
+Returns exactly what difflib.get_close_matches(token, vocabulary, n=1, cutoff) returns
+"""
+import difflib
+from typing import Iterable, Optional, Set
+
+import numpy as np
+
+_MISSING = object()  # memo sentinel (None is a valid correction)
+
+
+class SpellingIndex:
+    """
+    Built once per reference answer. Candidate lengths and character counts
+    are kept as arrays, so the real_quick_ratio and quick_ratio bounds of
+    every candidate are checked in one vectorized pass and only plausible
+    candidates reach SequenceMatcher. Corrections are memoized, since
+    students repeat the same misspellings.
+
+    Symmetric-delete / BK-tree indexes do not fit this cutoff: a 0.8 ratio
+    allows deletions worth 20% of both lengths combined (half of a short
+    token), so delete neighbourhoods explode, and the ratio is not a metric
+    a BK-tree could prune on without losing exactness.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], cutoff: float = 0.8, max_memo: int = 4096):
+        self.vocabulary = frozenset(vocabulary)
+        self.cutoff = cutoff
+        self.max_memo = max_memo
+
+        self._candidates = sorted(self.vocabulary)
+        self._lengths = np.array([len(candidate) for candidate in self._candidates], dtype=np.float64)
+        self._alphabet = {char: i for i, char in enumerate(sorted(set(''.join(self._candidates))))}
+        self._counts = np.zeros((len(self._candidates), len(self._alphabet)), dtype=np.int32)
+        for row, candidate in enumerate(self._candidates):
+            for char in candidate:
+                self._counts[row, self._alphabet[char]] += 1
+
+        self._memo = {}
+
+    def _plausible(self, token: str) -> np.ndarray:
+        """Rows passing real_quick_ratio and quick_ratio (same arithmetic as SequenceMatcher)"""
+        lb = len(token)
+        token_counts = np.zeros(len(self._alphabet), dtype=np.int32)
+        for char in token:
+            column = self._alphabet.get(char)
+            if column is not None:
+                token_counts[column] += 1
+
+        total = self._lengths + lb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            length_ok = (2.0 * np.minimum(self._lengths, lb) / total >= self.cutoff) | (total == 0)
+            # quick_ratio: multiset intersection of characters
+            common = np.minimum(self._counts, token_counts).sum(axis=1)
+            chars_ok = (2.0 * common / total >= self.cutoff) | (total == 0)
+        return np.flatnonzero(length_ok & chars_ok)
+
+    def closest(self, token: str) -> Optional[str]:
+        """Best candidate with ratio >= cutoff, or None"""
+        match = self._memo.get(token, _MISSING)
+        if match is not _MISSING:
+            return match
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(token)
+
+        best = None
+        for row in self._plausible(token):
+            candidate = self._candidates[row]
+            matcher.set_seq1(candidate)
+            score = matcher.ratio()
+            # get_close_matches keeps the largest (score, candidate) tuple
+            if score >= self.cutoff and (best is None or (score, candidate) > best):
+                best = (score, candidate)
+
+        result = best[1] if best else None
+        if len(self._memo) >= self.max_memo:
+            self._memo.clear()
+        self._memo[token] = result
+        return result
+
+    def correct(self, token: str) -> str:
+        """Return the token itself if known, its closest match, or the token unchanged"""
+        if token in self.vocabulary:
+            return token
+        match = self.closest(token)
+        return match if match is not None else token
+
+    def correct_tokens(self, tokens: Iterable[str]) -> Set[str]:
+        """Spelling-correct a set of tokens against the vocabulary"""
+        return {self.correct(token) for token in tokens}
@@ -0,0 +1,27 @@
+"""
+LinUCB arm selection checks
+Usage: python -m pytest test_linucb.py
+"""
+import numpy as np
+
+from linucb import LinUCB
+
+
+def contexts(n: int = 300) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.random((n, 6))
+
+
+def test_fresh_engine_does_not_always_pick_arm_zero():
+    # Every bound ties before any reward: selection must spread over the arms
+    arms = LinUCB(num_arms=3, context_size=6).select(contexts())
+    assert set(arms.tolist()) == {0, 1, 2}
+
+
+def test_rewarded_arm_wins():
+    bandit = LinUCB(num_arms=3, context_size=6, alpha=0.1)
+    x = contexts(200)
+    bandit.update(np.full(200, 2), x, np.ones(200))
+    bandit.update(np.zeros(200, dtype=np.int64), x, np.zeros(200))
+    bandit.update(np.ones(200, dtype=np.int64), x, np.zeros(200))
+    assert (bandit.select(x) == 2).all()
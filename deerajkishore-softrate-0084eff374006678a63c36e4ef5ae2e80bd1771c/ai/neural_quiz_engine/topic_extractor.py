@@ -4,27 +4,26 @@ Extracts topics from quiz titles and questions
 """
 import tensorflow as tf
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from topic_keywords import KEYWORDS
+from topic_registry import TOPIC_NAMES
+from vocabulary import load_vocabulary
 
 
 class TopicExtractorBrain(tf.keras.Model):
     """Lightweight text classifier for topic extraction"""
 
     def __init__(self, vocab_size: int = 10000, embedding_dim: int = 64,
-                 num_topics: int = 20, max_length: int = 100):
+                 num_topics: int = 20, max_length: int = 100,
+                 vocabulary_path: Optional[str] = None):
         super().__init__()
 
         self.max_length = max_length
         self.num_topics = num_topics
 
-        # Topic mapping (customize with your topics)
-        self.topic_names = [
-            'DBMS', 'Python', 'JavaScript', 'Java', 'C++',
-            'Data Structures', 'Algorithms', 'Networking', 'OS',
-            'System Design', 'OOPS', 'React', 'Node.js', 'AWS',
-            'DevOps', 'Machine Learning', 'SQL', 'MongoDB',
-            'Git', 'Docker'
-        ]
+        # Output unit i is registry topic id i
+        self.topic_names = list(TOPIC_NAMES[:num_topics])
 
         # Text processing layers
         self.text_vectorizer = tf.keras.layers.TextVectorization(
@@ -47,13 +46,23 @@ class TopicExtractorBrain(tf.keras.Model):
         self.output_layer = tf.keras.layers.Dense(
             num_topics, activation='softmax')
             
-        # Initialize vectorizer with topic names to prevent "Table not initialized" error
-        self.adapt_vectorizer(self.topic_names)
+        # Corpus vocabulary from build_vocabulary.py; without one, adapt on the
+        # topic names to prevent "Table not initialized" error
+        vocabulary = load_vocabulary(vocabulary_path)
+        self.vocabulary_loaded = vocabulary is not None
+        if self.vocabulary_loaded:
+            self.set_vocabulary(vocabulary)
+        else:
+            self.adapt_vectorizer(self.topic_names)
 
     def adapt_vectorizer(self, texts: List[str]):
         """Initialize the text vectorizer"""
         self.text_vectorizer.adapt(texts)
 
+    def set_vocabulary(self, tokens: List[str]):
+        """Load a prebuilt vocabulary (no adapt pass)"""
+        self.text_vectorizer.set_vocabulary(tokens)
+
     def call(self, inputs, training=False):
         # Process text
         x = self.text_vectorizer(inputs)
@@ -64,47 +73,19 @@ class TopicExtractorBrain(tf.keras.Model):
         x = self.dropout(x, training=training)
         return self.output_layer(x)
 
-    def extract_topics(self, text: str, threshold: float = 0.3, context: str = "") -> List[str]:
-        """Extract topics from text using Hybrid (Keyword + Neural) approach with Context Awareness"""
-        
-        # --- ENHANCED KEYWORD DICTIONARY ---
-        # Simulating "Massive Training" with a rich expert dictionary
+    def _keyword_topics(self, text: str, context: str = "") -> set:
+        """Keyword + context stage of extract_topics (empty set -> neural fallback)"""
         text_lower = text.lower()
         context_lower = context.lower()
-        found_topics = set()
-        
-        keywords = {
-            'Python': ['python', 'pip', 'def ', 'import ', 'list', 'dict', 'tuple', 'decorator', 'generator', 'pandas', 'numpy'],
-            'Java': ['java', 'jvm', 'jdk', 'public static', 'system.out', 'arraylist', 'hashmap', 'maven', 'spring'],
-            'JavaScript': ['javascript', 'js', 'node', 'npm', 'console.log', 'const', 'let', 'var', 'async', 'await', 'react', 'angular'],
-            # Stricter DBMS terms to avoid 'row/column' confusion in matrices
-            'DBMS': ['sql', 'database', 'dbms', 'normalization', 'acid', 'transaction', 'primary key', 'foreign key', 'mysql', 'mongodb', 'relation'],
-            'OOPS': ['class', 'object', 'inheritance', 'polymorphism', 'encapsulation', 'abstraction', 'interface', 'constructor', 'method overriding'],
-            'Networking': ['http', 'tcp', 'ip', 'dns', 'protocol', 'port', 'socket', 'osi model', 'ftp', 'ssh'],
-            'OS': ['operating system', 'kernel', 'deadlock', 'scheduler', 'paging', 'virtual memory', 'semaphore', 'mutex', 'process', 'thread'],
-            'AWS': ['aws', 'ec2', 's3', 'lambda', 'cloud', 'iam', 'vpc'],
-            'Data Structures': ['array', 'linked list', 'stack', 'queue', 'tree', 'graph', 'hash table', 'heap', 'b-tree', 'trie'],
-            'Algorithms': ['sorting', 'searching', 'recursion', 'dynamic programming', 'greedy', 'complexity', 'big o', 'bfs', 'dfs']
-        }
-        
-        # 1. Check Keywords
-        for topic, keys in keywords.items():
-            for key in keys:
-                # Word boundary check for short words to avoid substrings (e.g. 'os' in 'cost')
-                if len(key) < 4:
-                     import re
-                     if re.search(r'\b' + re.escape(key) + r'\b', text_lower):
-                         found_topics.add(topic)
-                         break
-                elif key in text_lower:
-                    found_topics.add(topic)
-                    break
+
+        # 1. Check Keywords (one pass over the text, see topic_keywords.py)
+        found_topics = set(KEYWORDS.match(text_lower))
 
         # 2. Context Bias (The "Quiz Title" Influence)
         # If context matches a topic key, prioritize it or related topics
         if context:
             # Check if context itself is a topic (or contained in it)
-            for topic in keywords.keys():
+            for topic in KEYWORDS.topics:
                 if topic.lower() in context_lower or context_lower in topic.lower():
                     # If we found other topics, but they are weak/generic, maybe the context overrides them?
                     # For now, we simply ensure the context topic is added if any part of it is plausibly relevant
@@ -119,20 +100,11 @@ class TopicExtractorBrain(tf.keras.Model):
              # DSA context: Remove 'DBMS' unless explicit SQL mentioned
              if 'DBMS' in found_topics and 'sql' not in text_lower and 'database' not in text_lower:
                   found_topics.discard('DBMS')
-        
-        if found_topics:
-            return list(found_topics)
-            
-        # --- NEURAL FALLBACK ---
-        # Only use if no keywords found
-        
-        # Convert text to tensor
-        text_tensor = tf.convert_to_tensor([text])
 
-        # Get predictions
-        predictions = self(text_tensor, training=False).numpy()[0]
+        return found_topics
 
-        # Get topics above threshold
+    def _neural_topics(self, predictions: np.ndarray, threshold: float) -> List[str]:
+        """Topics above threshold, or the top 2 if none is"""
         topic_indices = np.where(predictions > threshold)[0]
         topics = [self.topic_names[i] for i in topic_indices]
 
@@ -143,19 +115,37 @@ class TopicExtractorBrain(tf.keras.Model):
 
         return topics
 
-    def extract_topics_batch(self, texts: List[str]) -> List[List[str]]:
-        """Extract topics from multiple texts"""
-        text_tensor = tf.convert_to_tensor(texts)
-        predictions = self(text_tensor, training=False).numpy()
-
-        all_topics = []
-        for pred in predictions:
-            topic_indices = np.where(pred > 0.3)[0]
-            topics = [self.topic_names[i] for i in topic_indices]
-            if not topics:
-                top_indices = np.argsort(pred)[-2:][::-1]
-                topics = [self.topic_names[i] for i in top_indices]
-            all_topics.append(topics)
+    def extract_topics(self, text: str, threshold: float = 0.3, context: str = "") -> List[str]:
+        """Extract topics from text using Hybrid (Keyword + Neural) approach with Context Awareness"""
+        found_topics = self._keyword_topics(text, context)
+        if found_topics:
+            return list(found_topics)
+            
+        # --- NEURAL FALLBACK ---
+        # Only use if no keywords found
+        predictions = self(tf.convert_to_tensor([text]), training=False).numpy()[0]
+        return self._neural_topics(predictions, threshold)
+
+    def extract_topics_batch(self, texts: List[str], threshold: float = 0.3, context: str = "") -> List[List[str]]:
+        """
+        extract_topics for many texts (e.g. a whole question bank): keyword
+        misses are classified together in one forward pass
+        """
+        all_topics = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            found_topics = self._keyword_topics(text, context)
+            if found_topics:
+                all_topics[i] = list(found_topics)
+            else:
+                misses.append(i)
+
+        # --- NEURAL FALLBACK (batched) ---
+        if misses:
+            text_tensor = tf.convert_to_tensor([texts[i] for i in misses])
+            predictions = self(text_tensor, training=False).numpy()
+            for i, pred in zip(misses, predictions):
+                all_topics[i] = self._neural_topics(pred, threshold)
 
         return all_topics
 
@@ -0,0 +1,108 @@
+"""
+Topic Keywords - Expert keyword dictionary compiled into one matcher
+Finds exactly the topics the per-keyword scan finds (short keywords need
+word boundaries, longer ones match as substrings), in a single pass.
+"""
+import re
+from typing import Dict, List
+
+# --- ENHANCED KEYWORD DICTIONARY ---
+# Simulating "Massive Training" with a rich expert dictionary
+TOPIC_KEYWORDS = {
+    'Python': ['python', 'pip', 'def ', 'import ', 'list', 'dict', 'tuple', 'decorator', 'generator', 'pandas', 'numpy'],
+    'Java': ['java', 'jvm', 'jdk', 'public static', 'system.out', 'arraylist', 'hashmap', 'maven', 'spring'],
+    'JavaScript': ['javascript', 'js', 'node', 'npm', 'console.log', 'const', 'let', 'var', 'async', 'await', 'react', 'angular'],
+    # Stricter DBMS terms to avoid 'row/column' confusion in matrices
+    'DBMS': ['sql', 'database', 'dbms', 'normalization', 'acid', 'transaction', 'primary key', 'foreign key', 'mysql', 'mongodb', 'relation'],
+    'OOPS': ['class', 'object', 'inheritance', 'polymorphism', 'encapsulation', 'abstraction', 'interface', 'constructor', 'method overriding'],
+    'Networking': ['http', 'tcp', 'ip', 'dns', 'protocol', 'port', 'socket', 'osi model', 'ftp', 'ssh'],
+    'OS': ['operating system', 'kernel', 'deadlock', 'scheduler', 'paging', 'virtual memory', 'semaphore', 'mutex', 'process', 'thread'],
+    'AWS': ['aws', 'ec2', 's3', 'lambda', 'cloud', 'iam', 'vpc'],
+    'Data Structures': ['array', 'linked list', 'stack', 'queue', 'tree', 'graph', 'hash table', 'heap', 'b-tree', 'trie'],
+    'Algorithms': ['sorting', 'searching', 'recursion', 'dynamic programming', 'greedy', 'complexity', 'big o', 'bfs', 'dfs']
+}
+
+# Keywords shorter than this need word boundaries (e.g. 'os' in 'cost')
+MIN_SUBSTRING_LENGTH = 4
+
+
+class KeywordMatcher:
+    """
+    All keywords folded into a prefix trie and emitted as one regex inside a
+    lookahead, so each start position follows a single trie path and
+    overlapping hits are all seen. Greedy branches report the longest
+    keyword at a position; shorter keywords that are prefixes of it
+    ('java' in 'javascript') come from a precomputed table.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]] = TOPIC_KEYWORDS):
+        self.topics = list(keywords)
+
+        self._topics_of = {}  # keyword -> topic indices
+        for index, keys in enumerate(keywords.values()):
+            for key in keys:
+                self._topics_of.setdefault(key, set()).add(index)
+
+        ordered = sorted(self._topics_of, key=len, reverse=True)
+        # Long keywords match anywhere; all of them are longer than any short one
+        long_keys = [key for key in ordered if len(key) >= MIN_SUBSTRING_LENGTH]
+        short_keys = [key for key in ordered if len(key) < MIN_SUBSTRING_LENGTH]
+        self._pattern = re.compile(
+            '(?=(' + self._trie_pattern(long_keys, False) + r'|\b' + self._trie_pattern(short_keys, True) + '))')
+
+        # keyword -> [(shorter keyword that prefixes it, boundary pattern or None)]
+        self._prefixes = {
+            key: [
+                (prefix, re.compile(self._fragment(prefix)) if len(prefix) < MIN_SUBSTRING_LENGTH else None)
+                for prefix in ordered
+                if len(prefix) < len(key) and key.startswith(prefix)
+            ]
+            for key in ordered
+        }
+
+    @staticmethod
+    def _fragment(key: str) -> str:
+        if len(key) < MIN_SUBSTRING_LENGTH:
+            return r'\b' + re.escape(key) + r'\b'
+        return re.escape(key)
+
+    @staticmethod
+    def _trie_pattern(keys: List[str], bounded: bool) -> str:
+        """Regex of a keyword trie; `bounded` keywords must end at a word boundary"""
+        trie = {}
+        for key in keys:
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[None] = True
+
+        def emit(node) -> str:
+            branches = [re.escape(char) + emit(node[char]) for char in sorted(char for char in node if char is not None)]
+            if None not in node:
+                return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            if bounded:
+                return '(?:' + '|'.join(branches + [r'\b']) + ')' if branches else r'\b'
+            return '(?:' + '|'.join(branches) + ')?' if branches else ''
+
+        return emit(trie) if keys else '(?!)'
+
+    def match_ids(self, text_lower: str) -> List[int]:
+        """Indices (into self.topics) of every topic with a keyword in the lowercased text"""
+        hits = set()
+        for match in self._pattern.finditer(text_lower):
+            key = match.group(1)
+            hits.update(self._topics_of[key])
+            for prefix, bounded in self._prefixes[key]:
+                if bounded is None or bounded.match(text_lower, match.start()):
+                    hits.update(self._topics_of[prefix])
+            if len(hits) == len(self.topics):
+                break
+        return sorted(hits)
+
+    def match(self, text_lower: str) -> List[str]:
+        """Topics with a keyword in the lowercased text, in dictionary order"""
+        return [self.topics[i] for i in self.match_ids(text_lower)]
+
+
+# Compiled once per process
+KEYWORDS = KeywordMatcher(TOPIC_KEYWORDS)
@@ -0,0 +1,125 @@
+"""
+Topic Registry - Canonical topics shared by every brain
+Topics are interned to small integer ids (the 20 canonical topics are
+0..19, in TOPIC_NAMES order) and sets of topics are bitmasks over ids.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Canonical topics, in id order (matches the topic classifier's outputs)
+TOPIC_NAMES = (
+    'DBMS', 'Python', 'JavaScript', 'Java', 'C++',
+    'Data Structures', 'Algorithms', 'Networking', 'OS',
+    'System Design', 'OOPS', 'React', 'Node.js', 'AWS',
+    'DevOps', 'Machine Learning', 'SQL', 'MongoDB',
+    'Git', 'Docker'
+)
+
+# Alternative spellings seen in quiz titles / question documents
+TOPIC_ALIASES = {
+    'database': 'DBMS', 'databases': 'DBMS', 'database management system': 'DBMS',
+    'py': 'Python', 'python3': 'Python',
+    'js': 'JavaScript', 'ecmascript': 'JavaScript',
+    'core java': 'Java',
+    'cpp': 'C++', 'c plus plus': 'C++',
+    'data structure': 'Data Structures', 'dsa': 'Data Structures', 'ds': 'Data Structures',
+    'algorithm': 'Algorithms', 'algo': 'Algorithms',
+    'computer networks': 'Networking', 'computer networking': 'Networking', 'networks': 'Networking', 'cn': 'Networking',
+    'operating system': 'OS', 'operating systems': 'OS',
+    'hld': 'System Design', 'lld': 'System Design',
+    'oop': 'OOPS', 'object oriented programming': 'OOPS',
+    'reactjs': 'React', 'react.js': 'React',
+    'node': 'Node.js', 'nodejs': 'Node.js',
+    'amazon web services': 'AWS',
+    'ml': 'Machine Learning',
+    'mysql': 'SQL', 'postgresql': 'SQL',
+    'mongo': 'MongoDB',
+    'github': 'Git',
+}
+
+
+# Every user's PerformanceHistory holds one row per registered topic, so the
+# registry stops interning new topics at this size
+MAX_TOPICS = 256
+
+
+class TopicRegistry:
+    """Name/alias -> interned id; unknown topics get new ids on intern() until max_topics"""
+
+    def __init__(self, names: Iterable[str] = TOPIC_NAMES, aliases: Optional[Dict[str, str]] = None,
+                 max_topics: int = MAX_TOPICS):
+        self.names = []
+        self._ids = {}  # lowercase name or alias -> id
+        self._lock = threading.Lock()
+        self.max_topics = max_topics
+        self.rejected = 0  # intern() calls refused because the registry was full
+
+        for name in names:
+            self.intern(name)
+        self.num_canonical = len(self.names)
+        for alias, name in (aliases or {}).items():
+            self._ids[alias.strip().lower()] = self._ids[name.lower()]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def id(self, topic: str) -> Optional[int]:
+        """Id of a known topic or alias (case-insensitive), None otherwise"""
+        return self._ids.get(str(topic).strip().lower())
+
+    def intern(self, topic: str) -> Optional[int]:
+        """Id of a topic, registering it if it has never been seen (None once the registry is full)"""
+        topic_id = self.id(topic)
+        if topic_id is None:
+            with self._lock:
+                key = str(topic).strip().lower()
+                topic_id = self._ids.get(key)
+                if topic_id is None:
+                    if len(self.names) >= self.max_topics:
+                        if not self.rejected:
+                            print(f"⚠️  Topic registry full ({self.max_topics}): new topics are not tracked")
+                        self.rejected += 1
+                        return None
+                    topic_id = len(self.names)
+                    # Name first: readers that see the id can always resolve it
+                    self.names.append(str(topic).strip())
+                    self._ids[key] = topic_id
+        return topic_id
+
+    def canonical(self, topic: str) -> str:
+        """Canonical spelling of a topic (unknown topics are returned stripped)"""
+        topic_id = self.id(topic)
+        return self.names[topic_id] if topic_id is not None else str(topic).strip()
+
+    def name(self, topic_id: int) -> str:
+        return self.names[topic_id]
+
+    def ids(self, topics: Iterable[str]) -> np.ndarray:
+        """Ids of several topics, -1 for unknown ones"""
+        return np.array([self._ids.get(str(topic).strip().lower(), -1) for topic in topics], dtype=np.int64)
+
+    # --- Topic sets as bitmasks ---
+
+    def mask(self, topics: Iterable[str]) -> int:
+        """Bitmask of a topic set (unknown topics are interned, if there is room)"""
+        mask = 0
+        for topic in topics:
+            topic_id = self.intern(topic)
+            if topic_id is not None:
+                mask |= 1 << topic_id
+        return mask
+
+    def topics(self, mask: int) -> List[str]:
+        """Topic names of a bitmask, in id order"""
+        return [self.names[i] for i in range(min(mask.bit_length(), len(self.names))) if mask >> i & 1]
+
+    @staticmethod
+    def mask_vector(mask: int, topic_ids: np.ndarray) -> np.ndarray:
+        """0/1 float vector: is topic_ids[i] in the mask"""
+        return np.array([mask >> int(i) & 1 if i >= 0 else 0 for i in topic_ids], dtype=np.float64)
+
+
+# Process-wide registry used by every brain
+TOPICS = TopicRegistry(TOPIC_NAMES, TOPIC_ALIASES)
@@ -0,0 +1,192 @@
+"""
+Train the Answer Understanding Brain on historical quiz attempts
+Streams descriptive quiz_sessions.questions_attempted (user_answer,
+correct_answer, final_score; MCQs skipped) into a shuffled, batched,
+prefetched tf.data pipeline and fits the Siamese network with large
+batches on all CPU cores.
+Usage: python train_answer_encoder.py [--epochs N] [--batch-size N] [--limit N]
+"""
+import argparse
+import os
+import time
+from typing import Dict, Iterator, Set, Tuple
+
+import tensorflow as tf
+
+from answer_features import normalize_text
+from config import DynamicConfig
+
+BATCH_SIZE = 512
+SHUFFLE_BUFFER = 20000
+CURSOR_BATCH = 500
+
+
+def configure_threads():
+    """Use every core for both op-level and graph-level parallelism (before any op runs)"""
+    cores = os.cpu_count() or 1
+    tf.config.threading.set_intra_op_parallelism_threads(cores)
+    tf.config.threading.set_inter_op_parallelism_threads(cores)
+    return cores
+
+
+# Arms recorded for MCQ attempts (main.py interactive mode, server.py)
+MCQ_ARMS = ("Deterministic (MCQ)", "MCQ_Exact")
+
+
+def _option_question_ids(session: Dict) -> Set[str]:
+    """Ids of the session's questions that have options (MCQs)"""
+    ids = set()
+    for question in session.get('questions') or []:
+        if isinstance(question, dict) and question.get('options'):
+            ids.update(str(question[key]) for key in ('id', '_id', 'question_id') if key in question)
+    return ids
+
+
+def is_descriptive(attempt: Dict, mcq_ids: Set[str]) -> bool:
+    """
+    MCQ attempts (an option letter vs the answer text, scored 0/1) are noise
+    for a semantic encoder. Descriptive server attempts carry a score breakdown.
+    """
+    if attempt.get('scoring_arm') in MCQ_ARMS:
+        return False
+    if 'score_breakdown' in attempt and attempt['score_breakdown'] is None:
+        return False
+    return str(attempt.get('question_id')) not in mcq_ids
+
+
+def iter_attempts(db, counter: Dict, limit: int = 0) -> Iterator[Tuple[Tuple[str, str], float]]:
+    """Yield ((user_answer, correct_answer), score) for every usable descriptive attempt"""
+    projection = {
+        'questions_attempted.question_id': 1,
+        'questions_attempted.user_answer': 1,
+        'questions_attempted.correct_answer': 1,
+        'questions_attempted.final_score': 1,
+        'questions_attempted.score_breakdown': 1,
+        'questions_attempted.scoring_arm': 1,
+        'questions.id': 1,
+        'questions._id': 1,
+        'questions.question_id': 1,
+        'questions.options': 1
+    }
+    cursor = db[DynamicConfig.QUIZ_SESSIONS_COLLECTION].find(
+        {'questions_attempted.0': {'$exists': True}}, projection).batch_size(CURSOR_BATCH)
+
+    for session in cursor:
+        mcq_ids = _option_question_ids(session)
+        for attempt in session.get('questions_attempted', []):
+            user_answer = attempt.get('user_answer')
+            correct_answer = attempt.get('correct_answer')
+            score = attempt.get('final_score')
+            if user_answer is None or correct_answer is None or score is None:
+                continue
+            if not is_descriptive(attempt, mcq_ids):
+                continue
+
+            # Same normalization the scoring path applies before encoding
+            counter['pairs'] += 1
+            yield (normalize_text(str(user_answer)), normalize_text(str(correct_answer))), \
+                min(max(float(score), 0.0), 1.0)
+
+            if limit and counter['pairs'] >= limit:
+                return
+
+
+def build_dataset(db, counter: Dict, batch_size: int, limit: int = 0) -> tf.data.Dataset:
+    """Mongo stream -> cache -> shuffle -> batch -> prefetch"""
+    dataset = tf.data.Dataset.from_generator(
+        lambda: iter_attempts(db, counter, limit),
+        output_signature=(
+            (tf.TensorSpec(shape=(), dtype=tf.string), tf.TensorSpec(shape=(), dtype=tf.string)),
+            tf.TensorSpec(shape=(), dtype=tf.float32)
+        )
+    )
+    # Cached after the first epoch, so MongoDB is read once
+    return (dataset
+            .cache()
+            .shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+            .batch(batch_size)
+            .map(lambda pair, score: (pair, tf.expand_dims(score, -1)),
+                 num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Report examples/sec per epoch"""
+
+    def __init__(self, counter: Dict):
+        super().__init__()
+        self.counter = counter
+        self.epoch_start = 0.0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self.epoch_start
+        examples = self.counter['pairs']
+        loss = (logs or {}).get('loss', float('nan'))
+        print(f"   Epoch {epoch + 1}: {examples} examples in {elapsed:.1f}s "
+              f"({examples / elapsed if elapsed else 0.0:.0f} examples/sec) | loss {loss:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the answer encoder on quiz history")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--learning-rate', type=float, default=1e-3)
+    parser.add_argument('--limit', type=int, default=0, help="max attempts to read (0 = all)")
+    parser.add_argument('--output', default=DynamicConfig.ANSWER_WEIGHTS_PATH)
+    args = parser.parse_args()
+
+    cores = configure_threads()
+    print(f"🧵 TensorFlow threads: {cores}")
+
+    # Imported after thread configuration: brain construction runs TF ops
+    from answer_brain import AnswerUnderstandingBrain
+    from database.mongodb_client import mongodb_client
+
+    if mongodb_client.db is None:
+        raise SystemExit("❌ No MongoDB connection")
+    # Check for data before fit: ModelCheckpoint would write untrained weights
+    if next(iter_attempts(mongodb_client.db, {'pairs': 0}, limit=1), None) is None:
+        raise SystemExit("❌ No usable descriptive attempts found in quiz_sessions")
+
+    brain = AnswerUnderstandingBrain(
+        vocab_size=DynamicConfig.ANSWER_VOCAB_SIZE,
+        enable_cache=False,
+        vocabulary_path=DynamicConfig.ANSWER_VOCAB_PATH
+    )
+    if not brain.vocabulary_loaded:
+        print("⚠️  Answer vocabulary not found, run build_vocabulary.py first")
+    if os.path.exists(args.output):
+        print(f"♻️  Resuming from {args.output}")
+        brain.load_trained_weights(args.output)
+    brain.compile_for_training(args.learning_rate)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    counter = {'pairs': 0}
+    dataset = build_dataset(mongodb_client.db, counter, args.batch_size, args.limit)
+
+    print(f"🏋️  Training (batch {args.batch_size}, {args.epochs} epochs)...")
+    start = time.perf_counter()
+    history = brain.fit(
+        dataset,
+        epochs=args.epochs,
+        verbose=0,
+        callbacks=[
+            tf.keras.callbacks.ModelCheckpoint(args.output, save_weights_only=True),
+            ThroughputLogger(counter)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Trained on {counter['pairs']} pairs in {elapsed:.1f}s "
+          f"(final loss {history.history['loss'][-1]:.4f}) -> {args.output}")
+    print("   Re-run export_answer_encoder.py to refresh the NumPy backend")
+
+
+if __name__ == "__main__":
+    main()
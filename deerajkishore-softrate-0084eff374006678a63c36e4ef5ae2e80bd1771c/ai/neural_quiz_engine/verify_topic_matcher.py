@@ -0,0 +1,133 @@
+"""
+Regression check: KeywordMatcher vs the original per-keyword scan
+Runs both over a generated corpus (every keyword at word edges, inside
+words, next to punctuation) plus sample questions, and optionally over
+every question text in MongoDB.
+Usage: python verify_topic_matcher.py [--db] [--seed N]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from topic_keywords import KEYWORDS, TOPIC_KEYWORDS
+
+SAMPLE_QUESTIONS = [
+    "What is the difference between a process and a thread?",
+    "Explain ACID properties of a database transaction.",
+    "How does JavaScript handle async/await compared to promises?",
+    "What is the time complexity of binary search? Explain Big O.",
+    "Reverse a linked list in place.",
+    "Describe the OSI model and where TCP/IP fits.",
+    "What does System.out.println do in Java?",
+    "When would you use an ArrayList over an array?",
+    "Explain method overriding and polymorphism with a class example.",
+    "How do you configure an S3 bucket policy and IAM roles on AWS?",
+    "What is a trie and when is it faster than a hash table?",
+    "Write a Python generator that yields the Fibonacci sequence.",
+    "What is the cost of a context switch in the operating system kernel?",
+    "Explain virtual memory, paging and the role of the scheduler.",
+    "What is the purpose of a constructor in object oriented code?",
+    "Compare BFS and DFS for graph traversal.",
+    "Normalize the table to 3NF and define the primary key and foreign key.",
+    "Use const and let instead of var in modern JS.",
+    "How does a semaphore differ from a mutex?",
+    "Explain dynamic programming versus greedy algorithms.",
+    "Which port does SSH use by default? And FTP?",
+    "Rows and columns of a matrix",
+    "Describe the cost of an elegant javascript closure",
+    "",
+]
+
+FILLER = ['what', 'is', 'a', 'the', 'cost', 'hosts', 'explain', 'tip', 'letter', 'lets', 'javas',
+          'treehouse', 'ships', 'sqlite', 'arrays', 'node_modules', 'io', 'x', '3', '_', 'b']
+SEPARATORS = [' ', '', '.', ',', '-', '_', '/', '(', ')', '\n', "'", '3', ':']
+
+
+def legacy_keyword_topics(text_lower: str) -> set:
+    """The original TopicExtractorBrain.extract_topics keyword stage"""
+    found_topics = set()
+    for topic, keys in TOPIC_KEYWORDS.items():
+        for key in keys:
+            # Word boundary check for short words to avoid substrings (e.g. 'os' in 'cost')
+            if len(key) < 4:
+                if re.search(r'\b' + re.escape(key) + r'\b', text_lower):
+                    found_topics.add(topic)
+                    break
+            elif key in text_lower:
+                found_topics.add(topic)
+                break
+    return found_topics
+
+
+def generated_corpus(rng: random.Random):
+    """Every keyword in every separator context, then random mixtures"""
+    keys = [key for keys in TOPIC_KEYWORDS.values() for key in keys]
+    for key in keys:
+        for left in SEPARATORS:
+            for right in SEPARATORS:
+                yield f"x{left}{key}{right}y"
+                yield f"{left}{key}{right}"
+        yield key.upper()
+        yield key[:-1]
+        yield key[1:]
+
+    vocabulary = keys + FILLER
+    for _ in range(20000):
+        parts = rng.sample(vocabulary, rng.randint(1, 8))
+        yield ''.join(part + rng.choice(SEPARATORS) for part in parts)
+
+
+def database_corpus():
+    """Question / answer texts from MongoDB (questions collection and embedded quiz questions)"""
+    from database.mongodb_client import MongoDBClient
+
+    client = MongoDBClient()
+    fields = ('question_text', 'text', 'question', 'correct_answer', 'correctAnswer')
+    questions = list(client.db[client.QUESTIONS_COLLECTION].find({}, {field: 1 for field in fields}))
+    for quiz in client.db[client.QUIZZES_COLLECTION].find({}, {'questions': 1, 'title': 1}):
+        yield str(quiz.get('title', ''))
+        questions.extend(q for q in quiz.get('questions') or [] if isinstance(q, dict))
+    for question in questions:
+        for field in fields:
+            if isinstance(question.get(field), str):
+                yield question[field]
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compiled keyword matcher with the original scan")
+    parser.add_argument('--db', action='store_true', help="also check every question text in MongoDB")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = SAMPLE_QUESTIONS + list(generated_corpus(random.Random(args.seed)))
+    if args.db:
+        corpus += list(database_corpus())
+    corpus = [text.lower() for text in corpus]
+    print(f"📊 {len(corpus)} texts, {sum(len(t) for t in corpus)} characters")
+
+    start = time.perf_counter()
+    expected = [legacy_keyword_topics(text) for text in corpus]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [set(KEYWORDS.match(text)) for text in corpus]
+    matcher_s = time.perf_counter() - start
+
+    mismatches = [(text, e, a) for text, e, a in zip(corpus, expected, actual) if e != a]
+    for text, e, a in mismatches[:10]:
+        print(f"   ❌ {text!r}: expected {sorted(e)}, got {sorted(a)}")
+
+    print(f"   Per-keyword scan: {legacy_s * 1000:8.1f} ms")
+    print(f"   KeywordMatcher:   {matcher_s * 1000:8.1f} ms")
+    print(f"   Speedup: {legacy_s / matcher_s:.1f}x")
+    print(f"   {'✅ Identical topics' if not mismatches else f'❌ {len(mismatches)} mismatches'}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Vocabulary - Corpus-built token lists for the TextVectorization layers
+Built offline by build_vocabulary.py, loaded by the brains at startup
+"""
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, Optional
+
+
+# Same standardization as TextVectorization('lower_and_strip_punctuation')
+STRIP_PUNCTUATION = re.compile(r'[!"#$%&()\*\+,-\./:;<=>?@\[\\\]^_`{|}~\']')
+
+# Index 0 (padding) and index 1 (OOV) are added by the layer itself
+RESERVED_TOKENS = 2
+
+
+def standardize(text: str) -> List[str]:
+    """Lowercase, strip punctuation and split on whitespace, like TextVectorization"""
+    return STRIP_PUNCTUATION.sub('', str(text).lower()).split()
+
+
+def count_tokens(texts: Iterable[str], counter: Optional[Counter] = None) -> Counter:
+    """Accumulate token frequencies over a stream of texts"""
+    counter = counter if counter is not None else Counter()
+    for text in texts:
+        if text:
+            counter.update(standardize(text))
+    return counter
+
+
+def build_vocabulary(counter: Counter, max_tokens: int) -> List[str]:
+    """Most frequent tokens first (ties alphabetical), leaving room for padding + OOV"""
+    ranked = sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+    return [token for token, _ in ranked[:max(0, max_tokens - RESERVED_TOKENS)]]
+
+
+def save_vocabulary(tokens: List[str], filepath: str):
+    """One token per line"""
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(tokens))
+
+
+def load_vocabulary(filepath: Optional[str]) -> Optional[List[str]]:
+    """Token list from disk, or None if no (non-empty) vocabulary file exists"""
+    if not filepath or not os.path.exists(filepath):
+        return None
+    with open(filepath, 'r', encoding='utf-8') as f:
+        tokens = [line.strip() for line in f if line.strip()]
+    return tokens or None